@@ -0,0 +1,75 @@
+import sys
+import time
+import logging
+import argparse
+from difflib import SequenceMatcher
+from os.path import splitext
+
+from transcription import (DECODING_PROFILES, SAMPLE_RATE, decode_audio, resolve_decoding_options,
+                           transcribe_audio, whisper_registry)
+
+# Reports the real-time factor (transcription seconds per second of audio; lower is faster) of
+# each Whisper decoding profile, and how closely each transcript agrees with the reference
+# profile's, so the accuracy given up for throughput is explicit.
+#
+#   python benchmark_decoding.py record_out.wav --profiles fast default accurate --repeat 3
+
+
+def word_agreement(text: str, reference: str) -> float:
+    """Share of matching words between a transcript and the reference transcript."""
+    return SequenceMatcher(None, text.lower().split(), reference.lower().split()).ratio()
+
+
+def benchmark(paths, profiles, repeat=1, reference="accurate", language=None):
+    clips = []
+    for path in paths:
+        with open(path, "rb") as f:
+            audio = decode_audio(f.read(), splitext(path)[1])
+        if audio is None or audio.size == 0:
+            raise ValueError(f"Could not decode {path}")
+        clips.append((path, audio))
+    audio_seconds = sum(len(audio) for _, audio in clips) / SAMPLE_RATE
+
+    results = {}
+    for profile in profiles:
+        options = resolve_decoding_options(profile, language=language)
+        # Model loading (and quantization) is a one-off start-up cost; keep it out of the timings.
+        whisper_registry.get(options["model_size"], options["quantization"])
+        timings = []
+        for _ in range(repeat):
+            texts = []
+            start = time.perf_counter()
+            for _, audio in clips:
+                texts.append(transcribe_audio(audio, options)["text"].strip())
+            timings.append(time.perf_counter() - start)
+        results[profile] = {"seconds": min(timings), "rtf": min(timings) / audio_seconds, "texts": texts}
+
+    if reference in results:
+        for result in results.values():
+            result["agreement"] = sum(word_agreement(text, ref) for text, ref
+                                      in zip(result["texts"], results[reference]["texts"])) / len(clips)
+    return audio_seconds, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Real-time factor of each Whisper decoding profile.")
+    parser.add_argument("files", nargs="+", help="audio/video files to transcribe")
+    parser.add_argument("--profiles", nargs="+", default=list(DECODING_PROFILES), choices=list(DECODING_PROFILES))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per profile; the fastest is reported")
+    parser.add_argument("--reference", default="accurate", help="profile the other transcripts are compared with")
+    parser.add_argument("--language", default=None, help="language hint passed to every profile")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    audio_seconds, results = benchmark(args.files, args.profiles, args.repeat, args.reference, args.language)
+
+    print(f"{len(args.files)} file(s), {audio_seconds:.1f}s of audio")
+    print(f"{'profile':<10} {'seconds':>9} {'RTF':>7} {'x realtime':>11} {'agreement':>10}")
+    for profile, result in results.items():
+        agreement = f"{result['agreement']:.1%}" if "agreement" in result else "-"
+        print(f"{profile:<10} {result['seconds']:>9.2f} {result['rtf']:>7.3f} "
+              f"{1 / result['rtf']:>11.1f} {agreement:>10}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import numpy as np
+from deepface import DeepFace
+from deepface.modules import detection, preprocessing
+
+# Batched counterparts of DeepFace.represent. DeepFace runs the recognition model once per face;
+# these helpers apply the same detection and preprocessing steps as DeepFace.represent, but stack
+# the face crops of many images and run the model over them in one forward pass.
+
+
+def extract_face_crops(img, detector_backend="retinaface", enforce_detection=True, align=True):
+    """
+    Detects and aligns the faces in a BGR image.
+    Returns DeepFace face objects ("face", "facial_area", "confidence"), as DeepFace.represent
+    would use them. Raises ValueError if no face is found and `enforce_detection` is set.
+    """
+    return detection.extract_faces(
+        img_path=img,
+        detector_backend=detector_backend,
+        grayscale=False,
+        enforce_detection=enforce_detection,
+        align=align,
+    )
+
+
+def prepare_face(face, model_name="ArcFace", normalization="base") -> np.ndarray:
+    """
+    Converts one extracted face to a (1, h, w, 3) model input, like DeepFace.represent does.
+    """
+    model = DeepFace.build_model(model_name=model_name)
+    target_size = model.input_shape
+    # bgr to rgb
+    face = face[:, :, ::-1]
+    face = preprocessing.resize_image(img=face, target_size=(target_size[1], target_size[0]))
+    return preprocessing.normalize_input(img=face, normalization=normalization)
+
+
+def embed_faces(faces, model_name="ArcFace", normalization="base") -> np.ndarray:
+    """
+    Embeds extracted faces with one forward pass. Returns an (n, d) array.
+    """
+    model = DeepFace.build_model(model_name=model_name)
+    if len(faces) == 0:
+        return np.empty((0, model.output_shape), dtype=np.float32)
+    batch = np.concatenate([prepare_face(face, model_name, normalization) for face in faces], axis=0)
+    return np.asarray(model.model(batch, training=False))
@@ -0,0 +1,126 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from importlib import metadata
+import numpy as np
+
+
+def package_version(package: str) -> str:
+    """Installed version of a package, used to keep cache keys apart across model upgrades."""
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by a SHA-256 of the uploaded bytes plus the model name and version.
+
+    Identical uploads (client retries, replayed fixtures) return the stored embedding instead of
+    running the model again. The memory tier is an LRU bounded to `max_entries`; when `directory`
+    is set, embeddings are also written there as .npy files and survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 2048, directory: str = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data: bytes, model: str, version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{model}\0{version}\0".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def lookup(self, data: bytes, model: str, version: str):
+        """
+        Hashes the upload and looks it up. Returns (key, embedding or None); the key is passed to
+        `put` after a miss. Reads the disk tier, so call it off the event loop.
+        """
+        key = self.key(data, model, version)
+        return key, self.get(key)
+
+    def get(self, key: str):
+        """Returns the cached embedding, or None on a miss."""
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        embedding = self._read_disk(key)
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, embedding)
+        return embedding
+
+    def put(self, key: str, embedding):
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        with self._lock:
+            self._remember(key, embedding)
+        self._write_disk(key, embedding)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_tier": bool(self.directory),
+            }
+
+    def _remember(self, key, embedding):
+        # Caller must hold self._lock.
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".npy")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            embedding = np.load(path)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable embedding cache file {path}: {e}")
+            return None
+        embedding.setflags(write=False)
+        return embedding
+
+    def _write_disk(self, key, embedding):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, embedding)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to write embedding cache file {path}: {e}")
@@ -0,0 +1,73 @@
+import json
+import base64
+import struct
+import numpy as np
+
+# Compact binary transport for embeddings.
+#
+# Layout (little-endian): a 16-byte header followed by the raw values.
+#   bytes 0-3   magic b"EMBD"
+#   byte  4     dtype code (1 = float32, 2 = float16)
+#   bytes 5-7   reserved (zero)
+#   bytes 8-11  rows (0 for a single 1-D embedding)
+#   bytes 12-15 dimension
+# The header keeps the payload 16-byte aligned, so decoding is a zero-copy np.frombuffer view.
+# Over text transports (form fields, JSON bodies) the same bytes are sent base64-encoded.
+
+MAGIC = b"EMBD"
+HEADER = struct.Struct("<4sB3xII")
+DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+DTYPE_CODES = {"float32": 1, "float16": 2}
+
+
+def encode_embedding(embedding, dtype: str = "float32") -> bytes:
+    """
+    Encodes a 1-D embedding or an (n, d) stack of embeddings into the binary format.
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    code = DTYPE_CODES[dtype]
+    values = np.asarray(embedding, dtype=DTYPES[code])
+    if values.ndim == 1:
+        rows, dim = 0, values.shape[0]
+    elif values.ndim == 2:
+        rows, dim = values.shape
+    else:
+        raise ValueError("Expected a 1-D embedding or a 2-D stack of embeddings.")
+    return HEADER.pack(MAGIC, code, rows, dim) + values.tobytes()
+
+
+def decode_embedding(data) -> np.ndarray:
+    """
+    Decodes the binary format without copying the values. The result is a read-only view
+    of `data`, float32 or float16 as encoded.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Embedding payload is too short.")
+    magic, code, rows, dim = HEADER.unpack_from(data)
+    if magic != MAGIC or code not in DTYPES:
+        raise ValueError("Not a binary embedding payload.")
+    count = max(rows, 1) * dim
+    dtype = DTYPES[code]
+    if len(data) != HEADER.size + count * dtype.itemsize:
+        raise ValueError("Embedding payload size does not match its header.")
+    values = np.frombuffer(data, dtype=dtype, count=count, offset=HEADER.size)
+    return values.reshape(rows, dim) if rows else values
+
+
+def encode_embedding_base64(embedding, dtype: str = "float32") -> str:
+    return base64.b64encode(encode_embedding(embedding, dtype)).decode("ascii")
+
+
+def parse_embedding(text: str) -> np.ndarray:
+    """
+    Parses an embedding sent as text: a JSON list (the original format) or the base64 binary format.
+    """
+    text = text.strip()
+    if text.startswith("["):
+        return np.asarray(json.loads(text), dtype=np.float64)
+    try:
+        data = base64.b64decode(text, validate=True)
+    except ValueError as e:
+        raise ValueError(f"Embedding is neither a JSON list nor base64: {str(e)}")
+    return decode_embedding(data)
@@ -0,0 +1,196 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Default pool settings per model family: (kind, max_workers, max_queue).
+# Every value can be overridden per deployment with POOL_<FAMILY>_KIND ("thread" or "process"),
+# POOL_<FAMILY>_WORKERS and POOL_<FAMILY>_QUEUE, e.g. POOL_TRANSCRIPTION_WORKERS=4.
+POOL_DEFAULTS = {
+    "face": ("thread", 4, 32),           # DeepFace ArcFace / RetinaFace
+    "voice": ("thread", 2, 16),          # Resemblyzer
+    "transcription": ("thread", 2, 8),   # Whisper
+    "tabular": ("thread", 2, 64),        # XGBoost / RandomForest / priority scorer
+    "text": ("thread", 2, 64),           # keyword classification
+    "face_index": ("thread", 4, 64),     # 1:N search over the in-process FaceIndex
+}
+
+# Families whose jobs work on state held by this process (e.g. the FaceIndex matrix and its lock).
+# They always run in threads; POOL_<FAMILY>_KIND=process is ignored for them.
+IN_PROCESS_FAMILIES = {"face_index"}
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a pool already holds as many jobs as its workers and queue allow."""
+
+
+class ModelPool:
+    """
+    Executor for one model family with a bounded number of in-flight jobs.
+
+    Jobs beyond `max_workers + max_queue` are rejected with PoolSaturatedError instead of piling
+    up, so a burst of slow jobs in one family cannot grow memory or latency without bound.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: int = 1, max_queue: int = 0,
+                 initializer=None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind for '{name}': {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self.warm = initializer is None
+        if kind == "process":
+            # Every worker process loads its models once, before it takes its first job.
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"pool-{name}")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs that are queued or running."""
+        return self._pending
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Submits a job and returns its concurrent.futures.Future.
+        In process pools `fn` and its arguments must be picklable.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise PoolSaturatedError(f"The '{self.name}' pool is busy. Please retry shortly.")
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        # Released when the job actually finishes, even if the waiting request was cancelled.
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs `fn(*args, **kwargs)` in the pool and awaits its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def warm_up(self, timeout: float = 600):
+        """
+        Runs the initializer ahead of the first job. Threads share the models of this process, so
+        for a thread pool it runs once here; for a process pool this waits until every worker
+        process has run it. Raises TimeoutError if that takes longer than `timeout` seconds.
+        """
+        if self.initializer is None:
+            return
+        if self.kind == "thread":
+            self.initializer()
+        else:
+            wait_for_workers(self._executor, self.max_workers, timeout)
+        self.warm = True
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "warm": self.warm,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+
+def _ping(delay: float = 0.0) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+
+def wait_for_workers(executor: ProcessPoolExecutor, max_workers: int, timeout: float = 600) -> set:
+    """
+    Waits until every worker process of `executor` has started and run its initializer, and
+    returns their pids. Raises TimeoutError if that takes longer than `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    pids = set()
+    while len(pids) < max_workers:
+        # A worker only answers once its initializer has finished; the short sleep spreads
+        # the pings over the idle workers, so one ready worker cannot answer them all.
+        futures = [executor.submit(_ping, 0.1) for _ in range(max_workers)]
+        for future in futures:
+            pids.add(future.result(timeout=max(0.0, deadline - time.monotonic())))
+    return pids
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_initializers = {}
+
+
+def set_pool_initializer(family: str, initializer):
+    """
+    Registers the function that loads a family's models. Process pools run it in every worker
+    process, so it must be a picklable module-level function. Call before the pool is created.
+    """
+    with _pools_lock:
+        _initializers[family] = initializer
+
+
+def _pool_config(family: str):
+    kind, max_workers, max_queue = POOL_DEFAULTS.get(family, ("thread", 1, 0))
+    prefix = f"POOL_{family.upper()}_"
+    kind = os.getenv(prefix + "KIND", kind)
+    if family in IN_PROCESS_FAMILIES and kind != "thread":
+        logging.warning(f"The '{family}' pool works on in-process state; ignoring {prefix}KIND={kind}.")
+        kind = "thread"
+    max_workers = int(os.getenv(prefix + "WORKERS", max_workers))
+    max_queue = int(os.getenv(prefix + "QUEUE", max_queue))
+    return kind, max_workers, max_queue
+
+
+def get_pool(family: str) -> ModelPool:
+    """Returns the pool for a model family, creating it from its configuration on first use."""
+    with _pools_lock:
+        pool = _pools.get(family)
+        if pool is None:
+            kind, max_workers, max_queue = _pool_config(family)
+            pool = ModelPool(family, kind=kind, max_workers=max_workers, max_queue=max_queue,
+                             initializer=_initializers.get(family))
+            _pools[family] = pool
+            logging.info(f"Created '{family}' {kind} pool with {max_workers} workers and a queue of {max_queue}.")
+        return pool
+
+
+async def run_in_pool(family: str, fn, *args, **kwargs):
+    """
+    Runs blocking model work in the pool of its model family without blocking the event loop.
+    Raises PoolSaturatedError when that pool is full.
+    """
+    return await get_pool(family).run(fn, *args, **kwargs)
+
+
+def warm_up_pool(family: str):
+    """Creates a family's pool and warms it (see ModelPool.warm_up); used as a lifecycle warm-up."""
+    get_pool(family).warm_up()
+
+
+def pool_stats() -> dict:
+    with _pools_lock:
+        return {family: pool.stats() for family, pool in _pools.items()}
+
+
+def shutdown_pools(wait: bool = True):
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
@@ -0,0 +1,202 @@
+import os
+import json
+import base64
+import logging
+import threading
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # The approximate index is optional; exact search always works.
+    hnswlib = None
+
+
+def _normalize(embedding) -> np.ndarray:
+    embedding = np.asarray(embedding, dtype=np.float32).ravel()
+    return embedding / max(float(np.linalg.norm(embedding)), np.finfo(np.float32).eps)
+
+
+class FaceIndex:
+    """
+    In-process 1:N index of enrolled face embeddings.
+
+    Embeddings are stored L2-normalised in one float32 matrix, so an exact search is a single
+    matrix-vector product and the scores are cosine similarities. With `ann="hnsw"` (requires the
+    optional hnswlib package) an HNSW graph is built once the index holds `ann_min_size` faces and
+    is used for searches from then on.
+
+    When `path` is set, the index is persisted as a snapshot (`<path>.npz`) plus an append-only
+    journal (`<path>.log`) with one line per add or delete, so updates cost one small write. The
+    journal is folded into the snapshot every `compact_every` updates and by `compact()`.
+    """
+
+    def __init__(self, path: str = None, dim: int = 512, ann: str = None, ann_min_size: int = 10000,
+                 compact_every: int = 1000):
+        if ann not in (None, "", "hnsw"):
+            raise ValueError(f"Unknown approximate index type: {ann}")
+        if ann == "hnsw" and hnswlib is None:
+            logging.warning("hnswlib is not installed; the face index will use exact search only.")
+            ann = None
+        self.path = path
+        self.dim = dim
+        self.ann = ann or None
+        self.ann_min_size = ann_min_size
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._ids = []
+        self._rows = {}  # face id -> row in self._matrix
+        self._ann_index = None
+        self._labels = {}  # face id -> hnsw label
+        self._label_ids = {}  # hnsw label -> face id
+        self._next_label = 0
+        self._journal_entries = 0
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, face_id: str, embedding):
+        """Adds a face, replacing the stored embedding if `face_id` is already enrolled."""
+        embedding = _normalize(embedding)
+        if embedding.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {embedding.shape[0]}.")
+        with self._lock:
+            self._add(face_id, embedding)
+            self._journal({"op": "add", "id": face_id,
+                           "embedding": base64.b64encode(embedding.tobytes()).decode("ascii")})
+
+    def delete(self, face_id: str) -> bool:
+        """Removes a face. Returns False if it was not enrolled."""
+        with self._lock:
+            if not self._delete(face_id):
+                return False
+            self._journal({"op": "delete", "id": face_id})
+            return True
+
+    def search(self, embedding, k: int = 5) -> list:
+        """
+        Returns up to k (face id, cosine similarity) pairs, most similar first.
+        """
+        query = _normalize(embedding)
+        with self._lock:
+            count = len(self._ids)
+            k = min(k, count)
+            if k <= 0:
+                return []
+            if self.ann and count >= self.ann_min_size:
+                return self._search_ann(query, k)
+            scores = self._matrix[:count] @ query
+            top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[row], float(scores[row])) for row in top]
+
+    def compact(self):
+        """Writes a fresh snapshot and truncates the journal."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(tmp_path, ids=np.array(self._ids, dtype=str), embeddings=self._matrix[:len(self._ids)])
+            os.replace(tmp_path, self.path + ".npz")
+            open(self.path + ".log", "w").close()
+            self._journal_entries = 0
+            logging.info(f"Face index snapshot written with {len(self._ids)} faces.")
+
+    def _add(self, face_id, embedding):
+        row = self._rows.get(face_id)
+        if row is None:
+            row = len(self._ids)
+            if row == self._matrix.shape[0]:
+                grown = np.empty((max(16, 2 * row), self.dim), dtype=np.float32)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+            self._ids.append(face_id)
+            self._rows[face_id] = row
+        self._matrix[row] = embedding
+        if self._ann_index is not None:
+            self._ann_remove(face_id)
+            self._ann_add(face_id, embedding)
+
+    def _delete(self, face_id):
+        row = self._rows.pop(face_id, None)
+        if row is None:
+            return False
+        # Move the last row into the freed slot to keep the matrix dense.
+        last = len(self._ids) - 1
+        if row != last:
+            last_id = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+        self._ids.pop()
+        if self._ann_index is not None:
+            self._ann_remove(face_id)
+        return True
+
+    def _search_ann(self, query, k):
+        if self._ann_index is None:
+            self._build_ann()
+        self._ann_index.set_ef(max(64, k))
+        labels, distances = self._ann_index.knn_query(query, k=k)
+        # In the inner-product space the distance is 1 - similarity.
+        return [(self._label_ids[int(label)], float(1 - distance)) for label, distance in zip(labels[0], distances[0])]
+
+    def _build_ann(self):
+        count = len(self._ids)
+        self._ann_index = hnswlib.Index(space="ip", dim=self.dim)
+        self._ann_index.init_index(max_elements=max(1024, 2 * count), ef_construction=200, M=16)
+        self._labels, self._label_ids = {}, {}
+        self._next_label = 0
+        for face_id, embedding in zip(self._ids, self._matrix[:count]):
+            self._ann_add(face_id, embedding)
+        logging.info(f"Built HNSW face index over {count} faces.")
+
+    def _ann_add(self, face_id, embedding):
+        if self._ann_index.get_current_count() >= self._ann_index.get_max_elements():
+            self._ann_index.resize_index(2 * self._ann_index.get_max_elements())
+        label = self._next_label
+        self._next_label += 1
+        self._ann_index.add_items(embedding[np.newaxis, :], np.array([label]))
+        self._labels[face_id] = label
+        self._label_ids[label] = face_id
+
+    def _ann_remove(self, face_id):
+        label = self._labels.pop(face_id, None)
+        if label is not None:
+            self._ann_index.mark_deleted(label)
+            del self._label_ids[label]
+
+    def _journal(self, entry):
+        if not self.path:
+            return
+        with open(self.path + ".log", "a") as journal:
+            journal.write(json.dumps(entry) + "\n")
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_every:
+            self.compact()
+
+    def _load(self):
+        snapshot_path = self.path + ".npz"
+        if os.path.exists(snapshot_path):
+            snapshot = np.load(snapshot_path)
+            for face_id, embedding in zip(snapshot["ids"].tolist(), snapshot["embeddings"]):
+                self._add(face_id, embedding)
+        journal_path = self.path + ".log"
+        if os.path.exists(journal_path):
+            with open(journal_path) as journal:
+                for line in journal:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logging.warning("Skipping a truncated face index journal entry.")
+                        continue
+                    if entry["op"] == "add":
+                        self._add(entry["id"], np.frombuffer(base64.b64decode(entry["embedding"]), dtype=np.float32))
+                    elif entry["op"] == "delete":
+                        self._delete(entry["id"])
+                    self._journal_entries += 1
+        logging.info(f"Face index loaded with {len(self._ids)} faces.")
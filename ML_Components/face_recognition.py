@@ -1,21 +1,69 @@
-from deepface import DeepFace
-import numpy as np
+import os
+import threading
 import cv2
 from sklearn.metrics.pairwise import cosine_similarity
 from scipy.spatial.distance import euclidean
+from frame_sampler import resize_to_width
+from deepface_batch import extract_face_crops, embed_faces
 
-def get_face_embedding(image_array, model_name="Facenet"):
+# Photos wider than this are downscaled before Haar detection (0 disables the downscale).
+FACE_DETECTION_MAX_WIDTH = int(os.getenv("FACE_DETECTION_MAX_WIDTH", "1024"))
+# Smallest face, in full-resolution pixels, that detect_faces reports.
+FACE_MIN_SIZE = 30
+# Margin kept around the detected face, as a fraction of its size, when the face region is handed
+# to DeepFace, so its detector and eye-based alignment see the whole face.
+FACE_CROP_MARGIN = 0.5
 
-    try:
-        # Load OpenCV face detector
+# CascadeClassifier is not safe to share between threads, so each worker thread keeps its own.
+_cascade = threading.local()
+
+
+def get_face_cascade():
+    """Haar face detector of the calling thread, loaded from disk on first use."""
+    face_cascade = getattr(_cascade, "classifier", None)
+    if face_cascade is None:
         face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _cascade.classifier = face_cascade
+    return face_cascade
+
+
+def detect_faces(img, max_width=FACE_DETECTION_MAX_WIDTH):
+    """
+    Haar face boxes (x, y, w, h) in full-resolution coordinates. Detection runs on a grayscale
+    copy downscaled to `max_width` pixels wide.
+    """
+    gray = cv2.cvtColor(resize_to_width(img, max_width), cv2.COLOR_BGR2GRAY)
+    scale = img.shape[1] / gray.shape[1]
+    min_size = max(1, int(round(FACE_MIN_SIZE / scale)))
+    faces = get_face_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+    return [tuple(int(round(value * scale)) for value in face) for face in faces]
+
 
-        # Read image and convert to grayscale
+def face_region(img, face, margin=FACE_CROP_MARGIN):
+    """The part of the image around a face box (x, y, w, h), with `margin` of the box size on each side."""
+    x, y, w, h = face
+    dx, dy = int(w * margin), int(h * margin)
+    return img[max(0, y - dy):y + h + dy, max(0, x - dx):x + w + dx]
+
+
+def align_face(img, face):
+    """
+    Aligns a detected face the way DeepFace.represent does (its opencv detector, eye-based
+    rotation and crop), but only searches the region around the Haar box instead of the whole photo.
+    """
+    crops = extract_face_crops(face_region(img, face), detector_backend="opencv", enforce_detection=False)
+    largest = max(crops, key=lambda crop: crop["facial_area"]["w"] * crop["facial_area"]["h"])
+    return largest["face"]
+
+
+def get_face_embedding(image_array, model_name="Facenet"):
+
+    try:
+        # Read image
         img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
         # Detect faces using OpenCV
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        faces = detect_faces(img)
 
         # Strict Face Detection Check
         if len(faces) == 0:
@@ -23,10 +71,10 @@ def get_face_embedding(image_array, model_name="Facenet"):
         elif len(faces) > 1:
             return {"error": f"Multiple human faces detected ({len(faces)}). Ensure only one person is facing the camera."}
 
-        # Extract embeddings using DeepFace
-        embeddings = DeepFace.represent(img_path=img, model_name=model_name, enforce_detection=False)
+        # Align and embed only the detected face, with DeepFace's alignment and preprocessing
+        embedding = embed_faces([align_face(img, faces[0])], model_name=model_name)[0]
 
-        return {"embedding": embeddings[0].get('embedding', [])}
+        return {"embedding": embedding.tolist()}
 
     except Exception as e:
         return {"error": f"Error processing image: {str(e)}"}
@@ -2,6 +2,22 @@ from deepface import DeepFace
 import cv2
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
+from deepface_batch import extract_face_crops, embed_faces
+
+def warm_up_arcface():
+    """
+    Builds the RetinaFace detector and the ArcFace model and runs one dummy inference through them,
+    so the first real request does not pay for model construction or graph tracing.
+    """
+    DeepFace.build_model(model_name="ArcFace")
+    DeepFace.build_model(model_name="retinaface", task="face_detector")
+    dummy = np.zeros((224, 224, 3), dtype=np.uint8)
+    DeepFace.represent(
+        img_path=dummy,
+        model_name="ArcFace",
+        detector_backend="retinaface",
+        enforce_detection=False
+    )
 
 def get_arcface_embedding(image_array):
     """
@@ -33,6 +49,49 @@ def get_arcface_embedding(image_array):
     except Exception as e:
         return {"error": f"Failed to process image: {str(e)}"}
 
+def get_arcface_embeddings(image_arrays):
+    """
+    Batch version of get_arcface_embedding.
+    RetinaFace runs on each image, then the detected faces of all images go through ArcFace in one
+    forward pass. Returns one result per image, in order: the embedding of its first face, or an
+    error dict like get_arcface_embedding.
+    """
+    results = [None] * len(image_arrays)
+    faces = []
+    owners = []
+    for i, image_array in enumerate(image_arrays):
+        try:
+            img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+            face_objs = extract_face_crops(img, detector_backend="retinaface", enforce_detection=True)
+            if not face_objs:
+                results[i] = {"error": "No face detected."}
+                continue
+            faces.append(face_objs[0]["face"])
+            owners.append(i)
+        except Exception as e:
+            results[i] = {"error": f"Failed to process image: {str(e)}"}
+
+    try:
+        embeddings = embed_faces(faces, model_name="ArcFace")
+    except Exception as e:
+        for i in owners:
+            results[i] = {"error": f"Failed to process image: {str(e)}"}
+        return results
+    for i, embedding in zip(owners, embeddings):
+        results[i] = embedding.tolist()
+    return results
+
+def compare_embeddings(embedding, new_embedding, threshold=0.5):
+    """
+    Compares a stored face embedding with a freshly computed one using cosine similarity.
+    """
+    similarity_score = cosine_similarity([embedding], [new_embedding])[0][0]
+
+    return {
+    "is_match": bool(similarity_score >= threshold),
+    "similarity": float(similarity_score)
+}
+
 def compare_face_and_embedding(embedding, image_array, threshold=0.5):
     """
     Compares a stored face embedding with a new image using cosine similarity.
@@ -50,10 +109,4 @@ def compare_face_and_embedding(embedding, image_array, threshold=0.5):
     if isinstance(new_embedding, dict) and "error" in new_embedding:
         return new_embedding  # Return the error message
 
-    # Compute cosine similarity
-    similarity_score = cosine_similarity([embedding], [new_embedding])[0][0]
-
-    return {
-    "is_match": bool(similarity_score >= threshold),
-    "similarity": float(similarity_score)
-}
+    return compare_embeddings(embedding, new_embedding, threshold)
@@ -1,10 +1,12 @@
 import os
+import math
 import logging
 import tempfile
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator
 from os.path import splitext
 
-from transcription import process_file
+from transcription import process_file, transcribe_chunks, cached_transcript
+from keyword_automaton import KeywordAutomaton
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -98,16 +100,16 @@ DEPARTMENT_KEYWORDS = {
     "Customer Grievance & Fraud Resolution Department": extend_keywords(base_grievance_keywords, extra_grievance_keywords)
 }
 
-def classify_text(text: str) -> str:
+# Compiled once; classify_text scans each text a single time regardless of the number of keywords.
+DEPARTMENT_AUTOMATON = KeywordAutomaton(DEPARTMENT_KEYWORDS)
+
+def classify_text(text: str, whole_words: bool = False) -> str:
+    """
+    Returns the department whose keywords occur most often in the text.
+    With `whole_words`, keywords only match as whole words ("loan" no longer matches "loaning").
+    """
     text_lower = text.lower()
-    department_counts = {}
-    
-    for department, keywords in DEPARTMENT_KEYWORDS.items():
-        count = 0
-        for keyword in keywords:
-            if keyword in text_lower:
-                count += text_lower.count(keyword)
-        department_counts[department] = count
+    department_counts = DEPARTMENT_AUTOMATON.count(text_lower, whole_words=whole_words)
 
     logging.debug(f"Keyword counts for classification: {department_counts}")
 
@@ -116,6 +118,18 @@ def classify_text(text: str) -> str:
     logging.debug(f"Classified as: {best_match}")
     return best_match
 
+def classify_texts(texts: List[str], whole_words: bool = False) -> List[str]:
+    """
+    Classifies many texts with the shared automaton. Returns one department per text, in order.
+    Skips the per-text debug logging of classify_text, which dominates for large backfills.
+    """
+    departments = []
+    for text in texts:
+        department_counts = DEPARTMENT_AUTOMATON.count(text.lower(), whole_words=whole_words)
+        departments.append(max(department_counts, key=department_counts.get))
+    logging.debug(f"Classified a batch of {len(texts)} texts.")
+    return departments
+
 def process_text_query(text: str) -> Dict[str, Any]:
     try:
         logging.debug(f"Processing text query. Input text length: {len(text)}")
@@ -126,14 +140,38 @@ def process_text_query(text: str) -> Dict[str, Any]:
         # Fallback to the best department even on error
         return {"transcribed_text": text, "department": "Loan Services Department"}
 
+def process_text_queries(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Batch version of process_text_query. Returns one result per text, in order.
+    """
+    try:
+        departments = classify_texts(texts)
+    except Exception as e:
+        logging.error(f"Error in process_text_queries: {e}", exc_info=True)
+        return [process_text_query(text) for text in texts]
+    return [{"transcribed_text": text, "department": department} for text, department in zip(texts, departments)]
+
 def process_file_query(file) -> Dict[str, Any]:
     try:
         logging.debug(f"Processing file query for file: {file.filename}")
         file_data = file.file.read()
+    except Exception as e:
+        logging.error(f"Error in process_file_query: {e}", exc_info=True)
+        # Fallback to a default department on error
+        return {"transcribed_text": "", "department": "Loan Services Department"}
+    return process_media_query(file_data, file.filename)
+
+def process_media_query(file_data: bytes, filename: str, profile: str = None, language: str = None) -> Dict[str, Any]:
+    """
+    Same as process_file_query, but takes the already-read bytes so it can run in a worker pool.
+    `profile` and `language` select the Whisper decoding profile and language hint (see
+    transcription.process_file).
+    """
+    try:
         logging.debug(f"File size: {len(file_data)} bytes")
-        file_ext = splitext(file.filename)[1]
+        file_ext = splitext(filename)[1]
         
-        transcript = process_file(file_data, file_ext)
+        transcript = process_file(file_data, file_ext, profile=profile, language=language)
         if transcript is None:
             logging.warning("No transcript obtained; setting transcript as empty string.")
             transcript = ""
@@ -143,10 +181,83 @@ def process_file_query(file) -> Dict[str, Any]:
         department = classify_text(transcript)
         return {"transcribed_text": transcript, "department": department}
     except Exception as e:
-        logging.error(f"Error in process_file_query: {e}", exc_info=True)
+        logging.error(f"Error in process_media_query: {e}", exc_info=True)
         # Fallback to a default department on error
         return {"transcribed_text": "", "department": "Loan Services Department"}
 
+def cached_media_query(file_data: bytes, profile: str = None, language: str = None):
+    """
+    The process_media_query result for media whose transcript is already cached, or None on a miss.
+    """
+    transcript = cached_transcript(file_data, profile=profile, language=language)
+    if transcript is None:
+        return None
+    return {"transcribed_text": transcript, "department": classify_text(transcript)}
+
+class DepartmentTally:
+    """
+    Keyword counts per department, updated one transcript chunk at a time.
+
+    The decision is settled when the leading department is ahead of the runner-up by a sign test:
+    of the keyword hits shared by the two, the leader's share must be `z_threshold` standard
+    deviations above an even split, i.e. (a - b) / sqrt(a + b) >= z_threshold, with at least
+    `min_hits` hits between them. Keywords spanning two chunks are not counted.
+    """
+
+    def __init__(self, z_threshold: float = 3.0, min_hits: int = 5, whole_words: bool = False):
+        self.z_threshold = z_threshold
+        self.min_hits = min_hits
+        self.whole_words = whole_words
+        self.counts = {department: 0 for department in DEPARTMENT_KEYWORDS}
+
+    def update(self, text: str) -> Dict[str, int]:
+        for department, count in DEPARTMENT_AUTOMATON.count(text.lower(), whole_words=self.whole_words).items():
+            self.counts[department] += count
+        return self.counts
+
+    def leader(self) -> str:
+        # Same tie-breaking as classify_text
+        return max(self.counts, key=self.counts.get)
+
+    def settled(self) -> bool:
+        first, second = sorted(self.counts.values(), reverse=True)[:2]
+        hits = first + second
+        return hits >= self.min_hits and (first - second) / math.sqrt(hits) >= self.z_threshold
+
+def stream_media_query(file_data: bytes, filename: str, early_stop: bool = True,
+                       z_threshold: float = 3.0, min_hits: int = 5,
+                       profile: str = None, language: str = None) -> Iterator[Dict[str, Any]]:
+    """
+    Transcribes the media chunk by chunk and yields the classification as it evolves:
+    one {"event": "chunk", ...} per transcribed chunk with the text, the running keyword counts
+    and the current department, then a final {"event": "result", ...} shaped like the
+    process_media_query response. With `early_stop`, transcription stops as soon as the department
+    is settled (see DepartmentTally); the final result then says "stopped_early": true.
+    """
+    tally = DepartmentTally(z_threshold=z_threshold, min_hits=min_hits)
+    texts = []
+    stopped_early = False
+    try:
+        logging.debug(f"Streaming file query. File size: {len(file_data)} bytes")
+        chunks = transcribe_chunks(file_data, splitext(filename)[1], profile=profile, language=language)
+        for chunk in chunks:
+            texts.append(chunk["text"])
+            tally.update(chunk["text"])
+            settled = tally.settled()
+            yield {"event": "chunk", **chunk, "keyword_counts": dict(tally.counts),
+                   "department": tally.leader(), "settled": settled}
+            if early_stop and settled:
+                logging.debug(f"Department settled after {len(texts)} chunks; stopping transcription.")
+                stopped_early = True
+                chunks.close()
+                break
+    except Exception as e:
+        logging.error(f"Error in stream_media_query: {e}", exc_info=True)
+        yield {"event": "error", "error": f"Transcription failed: {str(e)}"}
+    # With no keywords at all the leader is the first department, as in classify_text.
+    yield {"event": "result", "transcribed_text": " ".join(text for text in texts if text),
+           "department": tally.leader(), "stopped_early": stopped_early}
+
 if __name__ == "__main__":
     sample_text = (
         "Inquiry regarding refinancing options and interest details on a secured loan for commercial purposes. "
@@ -0,0 +1,63 @@
+import cv2
+
+
+def resize_to_width(frame, max_width=None):
+    """
+    Downscales a frame so it is at most `max_width` pixels wide, keeping the aspect ratio.
+    """
+    if not max_width or frame.shape[1] <= max_width:
+        return frame
+    height = int(round(frame.shape[0] * max_width / frame.shape[1]))
+    return cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+
+
+def sample_frames(video_path, sample_rate=1.0, max_width=None, seek=False, fallback_fps=30.0):
+    """
+    Lazily yields one BGR frame every `sample_rate` seconds, downscaled to `max_width` if given.
+
+    Frames between samples are skipped with grab(), which advances the stream without decoding
+    the image. With `seek`, the capture jumps straight to each sampled frame instead; that is
+    faster for sparse sampling of long videos in codecs with frequent keyframes. When the FPS
+    metadata is missing, frame timestamps decide which frames to keep, and if those are missing
+    too the video is assumed to run at `fallback_fps`.
+    Only the current frame is held in memory, whatever the length of the video.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        if fps and fps > 0:
+            frame_interval = max(1, int(fps * sample_rate))
+            if seek and frame_count > 0:
+                for index in range(0, frame_count, frame_interval):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield resize_to_width(frame, max_width)
+                return
+
+            index = 0
+            while cap.grab():
+                if index % frame_interval == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        yield resize_to_width(frame, max_width)
+                index += 1
+            return
+
+        # No FPS metadata: pick frames by their timestamps.
+        index = 0
+        next_sample_time = 0.0
+        while cap.grab():
+            position_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            timestamp = position_ms / 1000 if position_ms > 0 or index == 0 else index / fallback_fps
+            if timestamp >= next_sample_time:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield resize_to_width(frame, max_width)
+                next_sample_time = timestamp + sample_rate
+            index += 1
+    finally:
+        cap.release()
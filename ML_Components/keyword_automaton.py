@@ -0,0 +1,104 @@
+from collections import deque
+from typing import Dict, List, Iterable
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton that counts keyword occurrences for several labels in one pass.
+
+    The automaton is built once from a mapping of label -> keywords. `count` then walks the text a
+    single time, so its cost depends on the length of the text and the number of matches, not on
+    how many keywords there are.
+
+    Counting follows `str.count`: occurrences of the same keyword never overlap, while different
+    keywords may overlap (e.g. "loan" and "loan approval" both count). A keyword listed under
+    several labels counts towards each of them. Matching is case-sensitive, so lower-case the text
+    and keywords beforehand if needed.
+    """
+
+    def __init__(self, keywords_by_label: Dict[str, Iterable[str]]):
+        self.labels = list(keywords_by_label.keys())
+        self.keywords: List[str] = []
+        self._keyword_labels: List[List[int]] = []  # keyword id -> label indexes
+
+        keyword_ids = {}
+        for label_index, keywords in enumerate(keywords_by_label.values()):
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                keyword_id = keyword_ids.get(keyword)
+                if keyword_id is None:
+                    keyword_id = keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self._keyword_labels.append([])
+                if label_index not in self._keyword_labels[keyword_id]:
+                    self._keyword_labels[keyword_id].append(label_index)
+
+        self._build()
+
+    def _build(self):
+        # Trie over all keywords. State 0 is the root.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[int]] = [[]]  # keyword ids that end exactly at each state
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append(keyword_id)
+
+        # Failure links by breadth-first search. Each state's outputs are extended with those of
+        # its failure state, so every keyword ending at a position is reported from one state.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def count_keywords(self, text: str, whole_words: bool = False) -> Dict[int, int]:
+        """
+        Returns keyword id -> number of occurrences for the keywords found in `text`.
+        With `whole_words`, a match only counts if it is not preceded or followed by a letter or digit.
+        """
+        goto, fail, outputs, keywords = self._goto, self._fail, self._outputs, self.keywords
+        counts = {}
+        last_end = {}
+        text_length = len(text)
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword_id in outputs[state]:
+                start = position - len(keywords[keyword_id]) + 1
+                if start <= last_end.get(keyword_id, -1):
+                    continue  # overlaps the previous occurrence of the same keyword
+                if whole_words and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (position + 1 < text_length and text[position + 1].isalnum())
+                ):
+                    continue
+                counts[keyword_id] = counts.get(keyword_id, 0) + 1
+                last_end[keyword_id] = position
+        return counts
+
+    def count(self, text: str, whole_words: bool = False) -> Dict[str, int]:
+        """
+        Returns the total keyword occurrences per label, in the order the labels were given.
+        """
+        label_counts = [0] * len(self.labels)
+        for keyword_id, keyword_count in self.count_keywords(text, whole_words).items():
+            for label_index in self._keyword_labels[keyword_id]:
+                label_counts[label_index] += keyword_count
+        return dict(zip(self.labels, label_counts))
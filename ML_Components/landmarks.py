@@ -0,0 +1,52 @@
+from itertools import chain
+import numpy as np
+
+# Eye landmark points (dlib indexes start at 0)
+(left_start, left_end) = (42, 48)
+(right_start, right_end) = (36, 42)
+EYE_INDEXES = np.array([np.arange(right_start, right_end), np.arange(left_start, left_end)])
+
+
+def shape_to_array(shape, dtype=np.float64) -> np.ndarray:
+    """
+    Converts a dlib full_object_detection to an (n_points, 2) array of (x, y) in one allocation.
+    """
+    coordinates = chain.from_iterable((point.x, point.y) for point in shape.parts())
+    return np.fromiter(coordinates, dtype=dtype, count=2 * shape.num_parts).reshape(-1, 2)
+
+
+def shapes_to_array(shapes, dtype=np.float64) -> np.ndarray:
+    """
+    Stacks the landmarks of several faces or frames into an (n, 68, 2) array.
+    """
+    if len(shapes) == 0:
+        return np.empty((0, 68, 2), dtype=dtype)
+    return np.stack([shape_to_array(shape, dtype) for shape in shapes])
+
+
+def eye_aspect_ratio(eye):
+    """
+    EAR of a single eye given as six (x, y) points, or of a batch of eyes shaped (..., 6, 2).
+    """
+    eye = np.asarray(eye, dtype=np.float64)
+    A = np.linalg.norm(eye[..., 1, :] - eye[..., 5, :], axis=-1)
+    B = np.linalg.norm(eye[..., 2, :] - eye[..., 4, :], axis=-1)
+    C = np.linalg.norm(eye[..., 0, :] - eye[..., 3, :], axis=-1)
+    return (A + B) / (2.0 * C)
+
+
+def eye_aspect_ratios(landmarks) -> np.ndarray:
+    """
+    EAR of both eyes from 68-point landmarks shaped (68, 2) or (n, 68, 2).
+    Returns (..., 2) with the right eye first, then the left eye.
+    """
+    landmarks = np.asarray(landmarks)
+    return eye_aspect_ratio(landmarks[..., EYE_INDEXES, :])
+
+
+def mean_eye_aspect_ratio(landmarks):
+    """
+    Average EAR of the two eyes, as used for blink detection. A float for one face, an (n,)
+    array for a batch.
+    """
+    return eye_aspect_ratios(landmarks).mean(axis=-1)
@@ -0,0 +1,169 @@
+import cv2
+import dlib
+from landmarks import shape_to_array, mean_eye_aspect_ratio
+
+def _scale_rect(rect, scale):
+    return dlib.rectangle(int(rect.left() * scale), int(rect.top() * scale),
+                          int(rect.right() * scale), int(rect.bottom() * scale))
+
+
+class BlinkCounter:
+    """
+    Counts blinks as transitions from closed eyes (EAR below the threshold for at least
+    `min_closed_frames` frames) back to open eyes. Frames without a face reset a closure in progress.
+    """
+
+    def __init__(self, ear_threshold=0.25, min_closed_frames=1):
+        self.ear_threshold = ear_threshold
+        self.min_closed_frames = min_closed_frames
+        self.blinks = 0
+        self.closed_frames = 0
+
+    def update(self, ear) -> bool:
+        """Feeds the EAR of one frame (None if no face). Returns True when a blink completes."""
+        if ear is None:
+            self.closed_frames = 0
+            return False
+        if ear < self.ear_threshold:
+            self.closed_frames += 1
+            return False
+        blinked = self.closed_frames >= self.min_closed_frames
+        if blinked:
+            self.blinks += 1
+        self.closed_frames = 0
+        return blinked
+
+
+class FaceTracker:
+    """
+    Follows one face across frames. The face is detected on a downscaled copy of the frame, then
+    followed with dlib's correlation tracker; detection only runs again every `redetect_every`
+    frames or when the tracking confidence drops below `min_confidence`.
+    """
+
+    def __init__(self, detector, max_width=320, redetect_every=15, min_confidence=7.0):
+        self.detector = detector
+        self.max_width = max_width
+        self.redetect_every = redetect_every
+        self.min_confidence = min_confidence
+        self._tracker = None
+        self._frames_since_detection = 0
+
+    def reset(self):
+        self._tracker = None
+        self._frames_since_detection = 0
+
+    def locate(self, gray):
+        """Returns the face rectangle in full-resolution coordinates, or None if there is no face."""
+        scale = 1.0
+        small = gray
+        if self.max_width and gray.shape[1] > self.max_width:
+            scale = gray.shape[1] / self.max_width
+            small = cv2.resize(gray, (self.max_width, int(round(gray.shape[0] / scale))), interpolation=cv2.INTER_AREA)
+
+        if self._tracker is not None and self._frames_since_detection < self.redetect_every:
+            confidence = self._tracker.update(small)
+            self._frames_since_detection += 1
+            if confidence >= self.min_confidence:
+                position = self._tracker.get_position()
+                return _scale_rect(position, scale)
+
+        faces = self.detector(small, 0)
+        self._frames_since_detection = 0
+        if len(faces) == 0:
+            self._tracker = None
+            return None
+        face = max(faces, key=lambda rect: rect.area())
+        self._tracker = dlib.correlation_tracker()
+        self._tracker.start_track(small, face)
+        return _scale_rect(face, scale)
+
+
+class LivenessDetector:
+    """
+    Blink-based liveness check over a stream of video frames.
+
+    Every `frame_stride`-th frame is analysed: the face is located with a FaceTracker, the
+    68-point predictor runs on it and the eye aspect ratio feeds a BlinkCounter. The decision is
+    taken as soon as it is known: live once `min_blinks` blinks are seen, spoof once the frames
+    left in the `frame_check` budget cannot hold the missing blinks.
+    """
+
+    def __init__(self, detector, predictor, ear_threshold=0.25, min_blinks=3, frame_check=100,
+                 frame_stride=1, max_width=320, redetect_every=15, min_closed_frames=1):
+        self.predictor = predictor
+        self.min_blinks = min_blinks
+        self.frame_check = frame_check
+        self.frame_stride = max(1, frame_stride)
+        self.tracker = FaceTracker(detector, max_width=max_width, redetect_every=redetect_every)
+        self.blink_counter = BlinkCounter(ear_threshold=ear_threshold, min_closed_frames=min_closed_frames)
+        self.frame_budget = frame_check
+
+    def start(self, total_frames=None):
+        """Resets the state for a new video. `total_frames` tightens the budget when known."""
+        self.tracker.reset()
+        self.blink_counter = BlinkCounter(self.blink_counter.ear_threshold, self.blink_counter.min_closed_frames)
+        self.frame_budget = min(self.frame_check, total_frames) if total_frames else self.frame_check
+
+    def should_process(self, frame_index) -> bool:
+        return frame_index % self.frame_stride == 0
+
+    def observe(self, frame):
+        """
+        Analyses one BGR (or grayscale) frame. Returns (face rectangle or None, EAR or None).
+        """
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        face = self.tracker.locate(gray)
+        ear = None
+        if face is not None:
+            landmarks = shape_to_array(self.predictor(gray, face))
+            ear = float(mean_eye_aspect_ratio(landmarks))
+        self.blink_counter.update(ear)
+        return face, ear
+
+    def decision(self, next_frame_index):
+        """
+        True or False once the outcome is settled, None while it still depends on later frames.
+        `next_frame_index` is the index of the next frame that has not been seen yet.
+        """
+        if self.blink_counter.blinks >= self.min_blinks:
+            return True
+        remaining_frames = self.frame_budget - next_frame_index
+        if remaining_frames <= 0:
+            return False
+        # Frames still to be analysed: multiples of the stride in [next_frame_index, frame_budget).
+        stride = self.frame_stride
+        remaining_processed = -(-self.frame_budget // stride) - -(-next_frame_index // stride)
+        # Each missing blink needs its closed frames plus one open frame.
+        frames_per_blink = self.blink_counter.min_closed_frames + 1
+        missing_blinks = self.min_blinks - self.blink_counter.blinks
+        needed = missing_blinks * frames_per_blink - min(self.blink_counter.closed_frames,
+                                                         self.blink_counter.min_closed_frames)
+        if needed > remaining_processed:
+            return False
+        return None
+
+    def is_live(self, video_path) -> bool:
+        cap = cv2.VideoCapture(video_path)
+        try:
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.start(total_frames if total_frames > 0 else None)
+            frame_index = 0
+            while frame_index < self.frame_budget:
+                if not self.should_process(frame_index):
+                    # Skip without decoding.
+                    if not cap.grab():
+                        break
+                    frame_index += 1
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.observe(frame)
+                frame_index += 1
+                decided = self.decision(frame_index)
+                if decided is not None:
+                    return decided
+            return self.blink_counter.blinks >= self.min_blinks
+        finally:
+            cap.release()
@@ -1,96 +1,586 @@
+import os
+import asyncio
 import logging
 import json
 import numpy as np
 import pandas as pd
 from fastapi import FastAPI, File, UploadFile, Request, Form
-from fastapi.responses import JSONResponse
-from typing import Annotated
-from face_recognition_new import get_arcface_embedding, compare_face_and_embedding
-from speech_recognition import get_voice_embedding, compare_voice_and_embedding
-from final_query_categorisation import process_file_query, process_text_query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from starlette.concurrency import iterate_in_threadpool
+from typing import Annotated, List, Optional
+from face_recognition_new import get_arcface_embeddings, compare_embeddings, warm_up_arcface
+from speech_recognition import get_voice_embedding, get_voice_embeddings, compare_voice_embeddings, \
+    warm_up_voice_encoder
+from final_query_categorisation import process_text_query, process_text_queries, stream_media_query, \
+    cached_media_query
+from transcription import transcript_cache, language_code, DECODING_PROFILES
+from vad import trim_stats, vad_signature
+from transcription_jobs import transcription_jobs
+from executors import run_in_pool, get_pool, pool_stats, set_pool_initializer, shutdown_pools, warm_up_pool, \
+    PoolSaturatedError
+from model_lifecycle import lifecycle
+from micro_batcher import MicroBatcher
+from face_index import FaceIndex
+from embedding_cache import EmbeddingCache, package_version
+from embedding_codec import encode_embedding, encode_embedding_base64, decode_embedding, parse_embedding
 import pickle
 import dill
 
 # Import the class so that dill will find it upon unpickling.
-from priority_model import CustomerPriorityScorer
+from priority_model import CustomerPriorityScorer, CompiledPriorityScorer, check_parity, parity_samples, \
+    predict_batch as predict_priority_batch, FEATURE_COLUMNS as PRIORITY_FIELDS
 
 app = FastAPI()
 logging.basicConfig(level=logging.DEBUG)
 
+# Models warmed at startup. Until all are warm, /healthz/ready answers 503 so the load balancer
+# keeps traffic away from this worker. The face and voice models are loaded by their pools: in
+# this process for thread pools, and in every worker process for process pools.
+set_pool_initializer("face", warm_up_arcface)
+set_pool_initializer("voice", warm_up_voice_encoder)
+lifecycle.register("face", lambda: warm_up_pool("face"))
+lifecycle.register("voice", lambda: warm_up_pool("voice"))
+lifecycle.register("transcription_workers", transcription_jobs.start)
+
+@app.on_event("startup")
+def warm_up_models():
+    """
+    Builds and warms the models in the background so that requests only pay for inference.
+    """
+    lifecycle.start_background_warm_up()
+
+@app.get("/healthz/live")
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/healthz/ready")
+async def readiness():
+    """
+    Returns 200 once every model has been built and warmed, 503 before that or if a warm-up failed.
+    """
+    ready = lifecycle.is_ready()
+    return JSONResponse(content={"ready": ready, "components": lifecycle.status()},
+                        status_code=200 if ready else 503)
+
+@app.on_event("shutdown")
+def shut_down():
+    shutdown_pools(wait=False)
+    transcription_jobs.shutdown(wait=False)
+    try:
+        face_index.compact()
+    except Exception as e:
+        logging.error("Failed to write face index snapshot: %s", str(e))
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    return JSONResponse(content={"error": str(exc)}, status_code=503)
+
+# Concurrent face requests are embedded together: a batch runs when FACE_BATCH_MAX_SIZE images
+# are waiting or FACE_BATCH_WINDOW_MS after the first one arrived.
+face_batcher = MicroBatcher(
+    get_arcface_embeddings,
+    family="face",
+    max_batch_size=int(os.getenv("FACE_BATCH_MAX_SIZE", "8")),
+    max_wait_ms=float(os.getenv("FACE_BATCH_WINDOW_MS", "5")),
+)
+
+# Embeddings of previously seen uploads, so retries and replays skip the models. Bounded to
+# EMBEDDING_CACHE_SIZE entries in memory; EMBEDDING_CACHE_DIR adds a persistent on-disk tier.
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+    directory=os.getenv("EMBEDDING_CACHE_DIR") or None,
+)
+FACE_MODEL = ("ArcFace/retinaface", package_version("deepface"))
+# The voice embedding depends on how silences were trimmed, so the VAD settings are part of its version.
+VOICE_MODEL = ("Resemblyzer", f"{package_version('Resemblyzer')}/{vad_signature()}")
+
+# Hashing an upload and the disk tier of the cache are blocking, so cache lookups and stores run
+# in a thread. The cache lives in this process, so they never run in the (possibly process) pools.
+async def face_embedding_for(image_bytes: bytes):
+    """
+    Returns the ArcFace embedding of an uploaded image as a list, or an error dict.
+    """
+    key, cached = await asyncio.to_thread(embedding_cache.lookup, image_bytes, *FACE_MODEL)
+    if cached is not None:
+        return cached.tolist()
+    result = await face_batcher.submit(np.frombuffer(image_bytes, np.uint8))
+    if not (isinstance(result, dict) and "error" in result):
+        await asyncio.to_thread(embedding_cache.put, key, result)
+    return result
+
+async def voice_embedding_for(audio_bytes: bytes) -> np.ndarray:
+    """
+    Returns the Resemblyzer embedding of an uploaded recording.
+    """
+    key, cached = await asyncio.to_thread(embedding_cache.lookup, audio_bytes, *VOICE_MODEL)
+    if cached is not None:
+        return cached
+    result = await run_in_pool("voice", get_voice_embedding, audio_bytes)
+    await asyncio.to_thread(embedding_cache.put, key, result)
+    return result
+
+def _lookup_all(uploads, model):
+    return [embedding_cache.lookup(upload, *model) for upload in uploads]
+
+def _put_all(entries):
+    for key, embedding in entries:
+        embedding_cache.put(key, embedding)
+
+async def voice_embeddings_for(audio_files: List[bytes]) -> np.ndarray:
+    """
+    Batch version of voice_embedding_for: only the recordings missing from the cache are embedded,
+    in one batched call. Returns an (n, 256) array in the order of `audio_files`.
+    """
+    lookups = await asyncio.to_thread(_lookup_all, audio_files, VOICE_MODEL)
+    embeddings = [cached for _, cached in lookups]
+    misses = [i for i, cached in enumerate(embeddings) if cached is None]
+    if misses:
+        computed = await run_in_pool("voice", get_voice_embeddings, [audio_files[i] for i in misses])
+        for i, embedding in zip(misses, computed):
+            embeddings[i] = embedding
+        await asyncio.to_thread(_put_all, [(lookups[i][0], embeddings[i]) for i in misses])
+    return np.array(embeddings, dtype=np.float32)
+
+@app.get("/metrics/pools")
+async def pool_metrics():
+    """
+    Kind, size, pending jobs and warm-up state of each model family's pool.
+    """
+    return pool_stats()
+
+@app.get("/metrics/embedding_cache")
+async def embedding_cache_metrics():
+    return embedding_cache.stats()
+
+@app.get("/metrics/transcript_cache")
+async def transcript_cache_metrics():
+    if transcript_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await asyncio.to_thread(transcript_cache.stats))}
+
+@app.get("/metrics/vad")
+async def vad_metrics():
+    """
+    Seconds of audio seen and cut as non-speech by the VAD stage, for transcription and voice.
+    Includes the trimming done by the transcription workers, added as each job finishes.
+    """
+    return trim_stats()
+
+EMBEDDING_FORMATS = ("json", "base64", "binary")
+
+def embedding_response(embedding, embedding_format: str, key: str = "embedding"):
+    """
+    Returns an embedding as a JSON list ("json"), as the base64 binary format inside JSON
+    ("base64"), or as the raw binary format in an application/octet-stream body ("binary").
+    """
+    if embedding_format == "binary":
+        return Response(content=encode_embedding(embedding), media_type="application/octet-stream")
+    if embedding_format == "base64":
+        return JSONResponse(content={key: encode_embedding_base64(embedding), "embedding_format": "base64"})
+    return JSONResponse(content={key: np.asarray(embedding).tolist()})
+
+async def read_embedding(embedding: Optional[str], embedding_file: Optional[UploadFile]):
+    """
+    Reads a stored embedding sent either as a text form field (JSON list or base64 binary format)
+    or as an uploaded file in the raw binary format.
+    """
+    if embedding_file is not None:
+        return decode_embedding(await embedding_file.read())
+    if embedding is None:
+        raise ValueError("Provide the stored embedding as 'embedding' or 'embedding_file'.")
+    return parse_embedding(embedding)
+
+def invalid_embedding_format(embedding_format: str):
+    if embedding_format not in EMBEDDING_FORMATS:
+        return JSONResponse(content={"error": "Invalid embedding_format. Expected one of: " + ", ".join(EMBEDDING_FORMATS)},
+                            status_code=400)
+    return None
+
 @app.post("/get_face_embedding")
-async def upload_image(image: Annotated[UploadFile, File(...)]):
+async def upload_image(image: Annotated[UploadFile, File(...)], embedding_format: str = "json"):
     """
     Extracts a face embedding from an uploaded image.
+    `embedding_format` selects a JSON list (default), base64 or raw binary (see embedding_codec).
     """
     try:
+        error = invalid_embedding_format(embedding_format)
+        if error is not None:
+            return error
         image_bytes = await image.read()
-        np_arr = np.frombuffer(image_bytes, np.uint8)
-        result = get_arcface_embedding(np_arr)
+        result = await face_embedding_for(image_bytes)
         if isinstance(result, dict) and "error" in result:
             return JSONResponse(content=result, status_code=400)
-        return JSONResponse(content={"embedding": result})
+        return embedding_response(result, embedding_format)
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"Failed to process image: {str(e)}"}, status_code=400)
 
 @app.post("/verify_face")
 async def compare_faces(image: Annotated[UploadFile, File(...)],
-                        embedding: Annotated[str, Form(...)]):
+                        embedding: Annotated[Optional[str], Form()] = None,
+                        embedding_file: Annotated[Optional[UploadFile], File()] = None):
     """
     Compares a new image with a stored face embedding.
+    The embedding is a JSON list or base64 binary form field, or a raw binary file upload.
     """
     try:
         image_bytes = await image.read()
-        image_array = np.frombuffer(image_bytes, np.uint8)
         try:
-            embedding_array = json.loads(embedding)
-            if not isinstance(embedding_array, list):
-                return JSONResponse(content={"error": "Invalid embedding format. Expected a JSON list."}, status_code=400)
+            embedding_array = await read_embedding(embedding, embedding_file)
+            if embedding_array.ndim != 1:
+                return JSONResponse(content={"error": "Invalid embedding format. Expected a single embedding."}, status_code=400)
         except json.JSONDecodeError as e:
             return JSONResponse(content={"error": f"Invalid JSON format in embedding: {str(e)}"}, status_code=400)
-        result = compare_face_and_embedding(embedding_array, image_array)
+        except ValueError as e:
+            return JSONResponse(content={"error": f"Invalid embedding format: {str(e)}"}, status_code=400)
+        new_embedding = await face_embedding_for(image_bytes)
+        if isinstance(new_embedding, dict) and "error" in new_embedding:
+            return new_embedding
+        result = compare_embeddings(embedding_array, new_embedding)
         return result
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"Failed to process image: {str(e)}"}, status_code=400)
+
+# Index of enrolled face embeddings for 1:N identification (e.g. duplicate-account checks).
+# FACE_INDEX_ANN=hnsw enables the approximate index once FACE_INDEX_ANN_MIN_SIZE faces are enrolled.
+try:
+    face_index = FaceIndex(
+        path=os.getenv("FACE_INDEX_PATH", "face_index"),
+        ann=os.getenv("FACE_INDEX_ANN") or None,
+        ann_min_size=int(os.getenv("FACE_INDEX_ANN_MIN_SIZE", "10000")),
+    )
+except Exception as e:
+    logging.error("Failed to load face index: %s", str(e))
+    face_index = FaceIndex()
+
+@app.post("/identify_face")
+async def identify_face(image: Annotated[UploadFile, File(...)], k: Annotated[int, Form()] = 5):
+    """
+    Finds the k enrolled faces most similar to the face in the uploaded image.
+    """
+    try:
+        image_bytes = await image.read()
+        embedding = await face_embedding_for(image_bytes)
+        if isinstance(embedding, dict) and "error" in embedding:
+            return JSONResponse(content=embedding, status_code=400)
+        matches = await run_in_pool("face_index", face_index.search, embedding, k)
+        return JSONResponse(content={"matches": [{"id": face_id, "similarity": similarity}
+                                                 for face_id, similarity in matches]})
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"Failed to process image: {str(e)}"}, status_code=400)
 
+@app.post("/face_index")
+async def enroll_face(face_id: Annotated[str, Form(...)],
+                      embedding: Annotated[Optional[str], Form()] = None,
+                      image: Annotated[Optional[UploadFile], File()] = None):
+    """
+    Adds or replaces a face in the identification index, from a stored embedding (JSON list or
+    base64 binary format) or from an image.
+    """
+    try:
+        if embedding is not None:
+            embedding_array = parse_embedding(embedding)
+        elif image is not None:
+            image_bytes = await image.read()
+            embedding_array = await face_embedding_for(image_bytes)
+            if isinstance(embedding_array, dict) and "error" in embedding_array:
+                return JSONResponse(content=embedding_array, status_code=400)
+        else:
+            return JSONResponse(content={"error": "Provide either an embedding or an image."}, status_code=400)
+        await run_in_pool("face_index", face_index.add, face_id, embedding_array)
+        return JSONResponse(content={"id": face_id, "size": len(face_index)})
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"Failed to enroll face: {str(e)}"}, status_code=400)
+
+@app.delete("/face_index/{face_id}")
+async def remove_face(face_id: str):
+    """
+    Removes a face from the identification index.
+    """
+    deleted = await run_in_pool("face_index", face_index.delete, face_id)
+    if not deleted:
+        return JSONResponse(content={"error": f"Face '{face_id}' is not enrolled."}, status_code=404)
+    return JSONResponse(content={"id": face_id, "size": len(face_index)})
+
 @app.post("/get_voice_embedding")
-async def upload_audio(audio: Annotated[UploadFile, File(...)]):
+async def upload_audio(audio: Annotated[UploadFile, File(...)], embedding_format: str = "json"):
     """
     Extracts a voice embedding from an uploaded audio file.
+    `embedding_format` selects a JSON list (default), base64 or raw binary (see embedding_codec).
     """
     try:
+        error = invalid_embedding_format(embedding_format)
+        if error is not None:
+            return error
         audio_bytes = await audio.read()
-        result = get_voice_embedding(audio_bytes)
-        return JSONResponse(content={"embedding": result.tolist()})
+        result = await voice_embedding_for(audio_bytes)
+        return embedding_response(result, embedding_format)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"Failed to process audio: {str(e)}"}, status_code=400)
+
+@app.post("/get_voice_embedding/batch")
+async def upload_audio_batch(audios: Annotated[List[UploadFile], File(...)], embedding_format: str = "json"):
+    """
+    Extracts voice embeddings from many audio files at once, for bulk enrollment.
+    The embeddings are returned in the order of the uploaded files.
+    """
+    try:
+        error = invalid_embedding_format(embedding_format)
+        if error is not None:
+            return error
+        audio_files = [await audio.read() for audio in audios]
+        result = await voice_embeddings_for(audio_files)
+        return embedding_response(result, embedding_format, key="embeddings")
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"Failed to process audio: {str(e)}"}, status_code=400)
 
 @app.post("/verify_voice")
 async def compare_voices(audio: Annotated[UploadFile, File(...)],
-                         embedding: Annotated[str, Form(...)]):
+                         embedding: Annotated[Optional[str], Form()] = None,
+                         embedding_file: Annotated[Optional[UploadFile], File()] = None):
     """
     Compares a voice recording with a stored voice embedding.
+    The embedding may also be a list of candidate embeddings, in which case every candidate is
+    scored in one call and the best match is reported. It is sent as a JSON list or base64 binary
+    form field, or as a raw binary file upload.
     """
     try:
         audio_bytes = await audio.read()
-        embedding_array = np.array(json.loads(embedding))
-        result = compare_voice_and_embedding(embedding=embedding_array, audio_file=audio_bytes)
+        embedding_array = await read_embedding(embedding, embedding_file)
+        embedding_test = await voice_embedding_for(audio_bytes)
+        result = compare_voice_embeddings(embedding_array, embedding_test)
         return JSONResponse(content=result)
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"Failed to process audio: {str(e)}"}, status_code=400)
 
+def invalid_decoding_options(profile: Optional[str], language: Optional[str]):
+    """
+    400 response for a decoding profile or language hint that does not exist, or None if both
+    are valid. The language is a Whisper language code ("hi") or name ("Hindi").
+    """
+    if profile is not None and profile not in DECODING_PROFILES:
+        return JSONResponse(content={"error": f"Unknown decoding profile '{profile}'. "
+                                              f"Choose one of: {', '.join(DECODING_PROFILES)}"},
+                            status_code=400)
+    if language is not None and language_code(language) is None:
+        return JSONResponse(content={"error": f"Unsupported language '{language}'. Use a Whisper "
+                                              f"language code such as 'en' or 'hi', or its name."},
+                            status_code=400)
+    return None
+
 @app.post("/query/file")
-async def query_file(file: UploadFile = File(...)):
+async def query_file(file: UploadFile = File(...), profile: Optional[str] = Form(None),
+                     language: Optional[str] = Form(None)):
     """
     Accepts an uploaded audio/video file and returns the transcribed text along with department classification.
+    `profile` picks the Whisper decoding profile ("default", "fast" or "accurate"; the deployment's
+    WHISPER_DECODING_PROFILE if omitted), and `language` is an optional hint that skips language detection.
+    """
+    error = invalid_decoding_options(profile, language)
+    if error is not None:
+        return error
+    file_data = await file.read()
+    # Re-submitted media is answered from the transcript cache without waiting for a worker.
+    cached = await asyncio.to_thread(cached_media_query, file_data, profile, language)
+    if cached is not None:
+        return cached
+    return await transcription_jobs.run(file_data, file.filename, profile, language)
+
+# Longest a GET /query/file/jobs/{job_id} request may hold the connection waiting for the result.
+JOB_MAX_WAIT_SECONDS = float(os.getenv("TRANSCRIPTION_JOB_MAX_WAIT", "30"))
+
+@app.post("/query/file/jobs")
+async def submit_query_file_job(file: UploadFile = File(...), profile: Optional[str] = Form(None),
+                                language: Optional[str] = Form(None)):
+    """
+    Queues an uploaded audio/video file for transcription and classification and returns its
+    job_id at once (202). Poll GET /query/file/jobs/{job_id} for the result. Answers 503 when the
+    transcription workers already have TRANSCRIPTION_MAX_PENDING jobs. Media with a cached
+    transcript gets a job that is already done. Takes the same `profile` and `language` fields
+    as /query/file.
     """
-    return process_file_query(file)
+    error = invalid_decoding_options(profile, language)
+    if error is not None:
+        return error
+    file_data = await file.read()
+    cached = await asyncio.to_thread(cached_media_query, file_data, profile, language)
+    if cached is not None:
+        job = transcription_jobs.add_cached(file.filename, cached)
+    else:
+        job = transcription_jobs.submit(file_data, file.filename, profile, language)
+    return JSONResponse(content={"job_id": job.id, "status": job.status}, status_code=202)
+
+@app.get("/query/file/jobs/{job_id}")
+async def get_query_file_job(job_id: str, wait: float = 0):
+    """
+    Returns the status of a transcription job, and its /query/file result once it is done.
+    With wait=N, the request is held for up to N seconds until the job finishes (long polling).
+    """
+    job = transcription_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"Unknown or expired job: {job_id}"}, status_code=404)
+    job = await transcription_jobs.wait(job, min(max(wait, 0), JOB_MAX_WAIT_SECONDS))
+    return job.to_dict()
+
+@app.get("/metrics/transcription_jobs")
+async def transcription_job_metrics():
+    return transcription_jobs.stats()
+
+# Streaming transcription stops once the leading department is this many standard deviations
+# ahead of the runner-up (see final_query_categorisation.DepartmentTally).
+QUERY_STREAM_SETTLE_Z = float(os.getenv("QUERY_STREAM_SETTLE_Z", "3.0"))
+QUERY_STREAM_MIN_HITS = int(os.getenv("QUERY_STREAM_MIN_HITS", "5"))
+
+def _format_stream_event(event: dict, sse: bool) -> str:
+    if sse:
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+@app.post("/query/file/stream")
+async def query_file_stream(request: Request, file: UploadFile = File(...), early_stop: bool = Form(True),
+                            profile: Optional[str] = Form(None), language: Optional[str] = Form(None)):
+    """
+    Streaming version of /query/file for long recordings. The audio is transcribed in chunks cut
+    at pauses, and the running department classification is sent after every chunk, then a final
+    result with the same fields as /query/file. With early_stop (the default), transcription ends
+    as soon as the department is statistically settled.
+    Events are sent as NDJSON, or as server-sent events when the client accepts text/event-stream.
+    Takes the same `profile` and `language` fields as /query/file.
+    Transcription runs in this process, unlike /query/file; the Whisper model is loaded here on
+    the first streamed request rather than at startup.
+    """
+    error = invalid_decoding_options(profile, language)
+    if error is not None:
+        return error
+    file_data = await file.read()
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    events = stream_media_query(file_data, file.filename, early_stop=early_stop,
+                                z_threshold=QUERY_STREAM_SETTLE_Z, min_hits=QUERY_STREAM_MIN_HITS,
+                                profile=profile, language=language)
+
+    if get_pool("transcription").kind != "thread":
+        # A generator cannot be handed to a worker process; iterate it in a thread instead.
+        async def results():
+            async for event in iterate_in_threadpool(events):
+                yield _format_stream_event(event, sse)
+    else:
+        # Each chunk is transcribed as a job in the transcription pool, so the stream is subject
+        # to the same concurrency limits as /query/file. The first chunk is awaited before the
+        # response starts, so a saturated pool still answers 503.
+        first_event = await run_in_pool("transcription", next, events, None)
+
+        async def results():
+            event = first_event
+            try:
+                while event is not None:
+                    yield _format_stream_event(event, sse)
+                    event = await run_in_pool("transcription", next, events, None)
+            except PoolSaturatedError as e:
+                yield _format_stream_event({"event": "error", "error": str(e)}, sse)
+
+    return StreamingResponse(results(), media_type="text/event-stream" if sse else "application/x-ndjson")
 
 @app.post("/query/text")
 async def query_text_route(text: str = Form(...)):
     """
     Accepts a text string and processes it directly with the model.
     """
-    return process_text_query(text)
+    return await run_in_pool("text", process_text_query, text)
+
+# Number of texts classified per pool job in /query/text/batch.
+TEXT_BATCH_CHUNK_SIZE = 512
+# Largest /query/text/batch request body accepted; the whole body is read before replying.
+TEXT_BATCH_MAX_BYTES = int(os.getenv("TEXT_BATCH_MAX_BYTES", str(64 * 1024 * 1024)))
+
+class RequestTooLarge(ValueError):
+    pass
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Reads the whole request body, failing with RequestTooLarge past `max_bytes`.
+    The body must be consumed before a StreamingResponse starts: once it does, Starlette listens
+    for the client disconnecting on the same receive channel and would swallow body messages.
+    """
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise RequestTooLarge(f"Request body exceeds {max_bytes} bytes; split the batch.")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _parse_ndjson(body: bytes) -> list:
+    """
+    Parses an NDJSON body into its JSON values, skipping blank lines.
+    """
+    return [json.loads(line) for line in body.split(b"\n") if line.strip()]
+
+def _classify_batch_items(items):
+    """
+    Classifies a chunk of batch items. Each item is a string or an object with a "text" field
+    and an optional "id" that is echoed back.
+    """
+    texts = [item.get("text") if isinstance(item, dict) else item for item in items]
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str)]
+    classified = iter(process_text_queries([texts[i] for i in valid]))
+    valid = set(valid)
+    results = []
+    for i, item in enumerate(items):
+        result = next(classified) if i in valid else {"error": "Expected a string or an object with a 'text' string."}
+        if isinstance(item, dict) and "id" in item:
+            result = {"id": item["id"], **result}
+        results.append(result)
+    return results
+
+@app.post("/query/text/batch")
+async def query_text_batch(request: Request):
+    """
+    Classifies many texts in one request, for backfills of the ticket backlog.
+    Accepts a JSON array, or NDJSON (Content-Type: application/x-ndjson) with one item per line,
+    up to TEXT_BATCH_MAX_BYTES. Items are strings or {"id": ..., "text": ...} objects. Results
+    are streamed back as NDJSON, one line per item, in the same order.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        body = await _read_body(request, TEXT_BATCH_MAX_BYTES)
+    except RequestTooLarge as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            items = _parse_ndjson(body)
+        else:
+            items = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return JSONResponse(content={"error": f"Invalid JSON body: {str(e)}"}, status_code=400)
+    if not isinstance(items, list):
+        return JSONResponse(content={"error": "Expected a JSON array of texts."}, status_code=400)
+
+    async def results():
+        try:
+            for start in range(0, len(items), TEXT_BATCH_CHUNK_SIZE):
+                chunk = items[start:start + TEXT_BATCH_CHUNK_SIZE]
+                for result in await run_in_pool("text", _classify_batch_items, chunk):
+                    yield json.dumps(result) + "\n"
+        except Exception as e:
+            # The status line is already sent, so report the failure in-band and stop.
+            logging.error(f"Error in /query/text/batch: {e}", exc_info=True)
+            yield json.dumps({"error": f"Failed to process batch: {str(e)}"}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 # Recommendation endpoint using loan_rf_model.pkl
 try:
@@ -117,10 +607,12 @@ async def recommendation(request: Request):
         if not all(field in data for field in required_fields):
             return JSONResponse(content={"error": "Missing required fields for recommendation"}, status_code=400)
         features = np.array([data[field] for field in required_fields]).reshape(1, -1)
-        proba = LOAN_MODEL.predict_proba(features)[0]
+        proba = (await run_in_pool("tabular", LOAN_MODEL.predict_proba, features))[0]
         sorted_loans = sorted(zip(LOAN_CLASSES, proba), key=lambda x: x[1], reverse=True)
         top_3_loans = [loan[0] for loan in sorted_loans[:3]]
         return JSONResponse(content={"top_3_loans": top_3_loans})
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"Failed to generate recommendation: {str(e)}"}, status_code=400)
 
@@ -133,6 +625,19 @@ except Exception as e:
     logging.error("Failed to load customer priority scorer: %s", str(e))
     priority_scorer = None
 
+# Freeze the scorer into the pandas-free fast path, keeping it only if it reproduces the original.
+compiled_priority_scorer = None
+if priority_scorer is not None and priority_scorer.model is not None:
+    try:
+        compiled_priority_scorer = CompiledPriorityScorer(priority_scorer)
+        max_difference = check_parity(priority_scorer, compiled_priority_scorer, parity_samples(n=10))
+        if max_difference != 0.0:
+            logging.warning("Compiled priority scorer differs by %s; using the pandas path", max_difference)
+            compiled_priority_scorer = None
+    except Exception as e:
+        logging.warning("Priority scorer cannot be compiled, using the pandas path: %s", str(e))
+        compiled_priority_scorer = None
+
 @app.post("/prioritization")
 async def prioritization(request: Request):
     """
@@ -145,12 +650,41 @@ async def prioritization(request: Request):
         if priority_scorer is None or priority_scorer.model is None:
             return JSONResponse(content={"error": "Priority model not loaded or not trained"}, status_code=500)
         data = await request.json()
-        required_fields = ['Credit Score', 'Total Assets', 'Net Monthly Income', 'Monthly Transactions',
-                           'High-Value Transactions', 'Sentiment Score', 'Missed Payments', 'Fraud Risk']
+        required_fields = PRIORITY_FIELDS
         if not all(field in data for field in required_fields):
             return JSONResponse(content={"error": "Missing required fields. Required: " + ", ".join(required_fields)},
                                 status_code=400)
-        prediction = priority_scorer.predict(data)
+        if compiled_priority_scorer is not None:
+            # A few microseconds of NumPy; cheaper inline than a pool round trip.
+            prediction = compiled_priority_scorer.predict(data)
+        else:
+            prediction = await run_in_pool("tabular", priority_scorer.predict, data)
         return JSONResponse(content={"priority_score": prediction})
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"Failed to generate priority score: {str(e)}"}, status_code=400)
+
+@app.post("/prioritization/batch")
+async def prioritization_batch(request: Request):
+    """
+    Accepts a JSON array of customers (same fields as /prioritization) and returns their
+    priority scores in the same order, computed with a single model call.
+    """
+    try:
+        if priority_scorer is None or priority_scorer.model is None:
+            return JSONResponse(content={"error": "Priority model not loaded or not trained"}, status_code=500)
+        data = await request.json()
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            return JSONResponse(content={"error": "Expected a JSON array of customer objects."}, status_code=400)
+        for index, item in enumerate(data):
+            if not all(field in item for field in PRIORITY_FIELDS):
+                return JSONResponse(content={"error": f"Missing required fields in item {index}. Required: "
+                                                      + ", ".join(PRIORITY_FIELDS)},
+                                    status_code=400)
+        predictions = await run_in_pool("tabular", predict_priority_batch, priority_scorer, data)
+        return JSONResponse(content={"priority_scores": predictions.tolist()})
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"Failed to generate priority scores: {str(e)}"}, status_code=400)
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+from executors import run_in_pool
+
+
+class MicroBatcher:
+    """
+    Groups concurrent requests into batches for a model that is cheaper per item in bulk.
+
+    Coroutines call `submit(item)`. Items are collected until `max_batch_size` are waiting or
+    `max_wait_ms` has passed since the first one arrived, then `process_batch(items)` runs in the
+    pool of `family` and each caller gets the result at its position. A batch that raises fails all
+    of its callers with that exception. Must be used from a single event loop.
+    """
+
+    def __init__(self, process_batch, family: str, max_batch_size: int = 8, max_wait_ms: float = 5):
+        self.process_batch = process_batch
+        self.family = family
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._waiting = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((item, future))
+        if len(self._waiting) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._waiting = self._waiting, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference until the batch is done so the task is not garbage collected.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await run_in_pool(self.family, self.process_batch, items)
+        except Exception as e:
+            logging.error(f"Batch of {len(items)} '{self.family}' requests failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        logging.debug(f"Processed a batch of {len(items)} '{self.family}' requests.")
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,78 @@
+import time
+import logging
+import threading
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelLifecycle:
+    """
+    Tracks the warm-up of the models a worker needs before it should receive traffic.
+
+    Components are registered with a warm-up function that builds the model and runs a dummy
+    inference. `warm_up_all` runs them in registration order; the worker is ready once every
+    required component has warmed up successfully.
+    """
+
+    def __init__(self):
+        self._components = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, warm_up, required: bool = True):
+        with self._lock:
+            self._components[name] = {
+                "warm_up": warm_up,
+                "required": required,
+                "status": PENDING,
+                "seconds": None,
+                "error": None,
+            }
+
+    def warm_up_all(self):
+        with self._lock:
+            names = list(self._components.keys())
+        for name in names:
+            self.warm_up(name)
+
+    def warm_up(self, name: str):
+        component = self._components[name]
+        component["status"] = LOADING
+        logging.info(f"Warming up '{name}'...")
+        start = time.perf_counter()
+        try:
+            component["warm_up"]()
+        except Exception as e:
+            component["status"] = FAILED
+            component["error"] = str(e)
+            logging.error(f"Failed to warm up '{name}': {e}", exc_info=True)
+        else:
+            component["status"] = READY
+            component["error"] = None
+            logging.info(f"'{name}' is warm.")
+        component["seconds"] = round(time.perf_counter() - start, 3)
+
+    def start_background_warm_up(self) -> threading.Thread:
+        """
+        Warms all components in a daemon thread, so the server can answer health checks meanwhile.
+        """
+        thread = threading.Thread(target=self.warm_up_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(c["status"] == READY for c in self._components.values() if c["required"])
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                name: {key: c[key] for key in ("status", "required", "seconds", "error")}
+                for name, c in self._components.items()
+            }
+
+
+# Shared by the FastAPI app; components are registered in main.py.
+lifecycle = ModelLifecycle()
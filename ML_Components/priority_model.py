@@ -1,6 +1,14 @@
 import numpy as np
 import pandas as pd
 
+# Raw input features, in the column order used for training.
+FEATURE_COLUMNS = ['Credit Score', 'Total Assets', 'Net Monthly Income', 'Monthly Transactions',
+                   'High-Value Transactions', 'Sentiment Score', 'Missed Payments', 'Fraud Risk']
+# Features derived in preprocess_data and appended after the raw ones.
+ENGINEERED_COLUMNS = ['Assets_to_Income_Ratio', 'Transaction_Intensity']
+# Values used for missing inputs, matching preprocess_data.
+FEATURE_DEFAULTS = {'Sentiment Score': 50}
+
 class CustomerPriorityScorer:
     def __init__(self, config):
         self.config = config
@@ -87,6 +95,134 @@ class CustomerPriorityScorer:
         return float(prediction)
 
 
+# The batch and compiled paths below are plain functions of the scorer's fitted attributes
+# (model, feature_scaler) rather than CustomerPriorityScorer methods: the shipped
+# customer_priority_model.pkl stores the class by value, so the unpickled object carries the
+# original class body and none of the methods added since.
+
+def feature_names(scorer) -> list:
+    """
+    Returns the model's input columns in the order the feature scaler was fitted with.
+    """
+    names = getattr(scorer.feature_scaler, "feature_names_in_", None)
+    if names is not None:
+        return list(names)
+    return FEATURE_COLUMNS + ENGINEERED_COLUMNS
+
+
+def raw_feature_matrix(data) -> np.ndarray:
+    """
+    Converts a list of dicts to an (n, 8) float matrix with columns in FEATURE_COLUMNS order.
+    Missing values get the same defaults as preprocess_data. NumPy input is assumed to already
+    be in FEATURE_COLUMNS order.
+    """
+    if isinstance(data, np.ndarray):
+        raw = np.asarray(data, dtype=np.float64)
+    else:
+        raw = np.array([[row.get(col, FEATURE_DEFAULTS.get(col, 0)) for col in FEATURE_COLUMNS] for row in data],
+                       dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+    if raw.ndim != 2 or raw.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"Expected a matrix with {len(FEATURE_COLUMNS)} columns: {', '.join(FEATURE_COLUMNS)}")
+    return raw
+
+
+def feature_matrix(raw: np.ndarray, names: list) -> np.ndarray:
+    """
+    Appends the engineered ratios to a raw feature matrix and orders the columns as `names`.
+    """
+    columns = {name: raw[:, i] for i, name in enumerate(FEATURE_COLUMNS)}
+    columns['Assets_to_Income_Ratio'] = columns['Total Assets'] / (columns['Net Monthly Income'] + 1)
+    columns['Transaction_Intensity'] = columns['Monthly Transactions'] * columns['High-Value Transactions']
+    return np.column_stack([columns[name] for name in names])
+
+
+def scale_features(feature_scaler, X: np.ndarray) -> np.ndarray:
+    """
+    Applies a fitted StandardScaler as plain array operations.
+    """
+    mean = feature_scaler.mean_ if feature_scaler.with_mean else 0.0
+    scale = feature_scaler.scale_ if feature_scaler.with_std else 1.0
+    return (X - mean) / scale
+
+
+def predict_batch(scorer, data) -> np.ndarray:
+    """
+    Scores many customers with a single model call.
+    Accepts a list of dicts (like CustomerPriorityScorer.predict) or an (n, 8) NumPy matrix in
+    FEATURE_COLUMNS order. The weighted priority score and its MinMaxScaler only produce the
+    training target, so they are not computed here.
+    """
+    if scorer.model is None:
+        raise ValueError("The model has not been trained.")
+    raw = raw_feature_matrix(data)
+    if len(raw) == 0:
+        return np.empty(0)
+    names = feature_names(scorer)
+    X_scaled = scale_features(scorer.feature_scaler, feature_matrix(raw, names))
+    # Keep the column names the model was fitted with.
+    X_scaled = pd.DataFrame(X_scaled, columns=names)
+    return np.asarray(scorer.model.predict(X_scaled), dtype=np.float64)
+
+
+class CompiledPriorityScorer:
+    """
+    Pandas-free single-row scorer frozen from a fitted CustomerPriorityScorer.
+
+    The StandardScaler parameters and the linear model's coefficients are copied into flat NumPy
+    vectors once, so scoring one customer is a fixed sequence of array operations. The operations
+    match preprocess_data and LinearRegression.predict step by step, so scores agree with
+    CustomerPriorityScorer.predict (see check_parity). Only linear models (with coef_ and
+    intercept_) can be compiled.
+    """
+
+    def __init__(self, scorer: CustomerPriorityScorer):
+        model = scorer.model
+        if model is None:
+            raise ValueError("The model has not been trained.")
+        if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+            raise ValueError(f"Cannot compile a {type(model).__name__}; only linear models are supported.")
+        canonical = FEATURE_COLUMNS + ENGINEERED_COLUMNS
+        self.feature_names = feature_names(scorer)
+        self._order = np.array([canonical.index(name) for name in self.feature_names])
+        feature_scaler = scorer.feature_scaler
+        self._mean = feature_scaler.mean_.copy() if feature_scaler.with_mean else np.zeros(len(canonical))
+        self._scale = feature_scaler.scale_.copy() if feature_scaler.with_std else np.ones(len(canonical))
+        self._coef_t = np.array(model.coef_, dtype=np.float64).T
+        self._intercept = np.array(model.intercept_, dtype=np.float64)
+
+    def predict(self, data: dict) -> float:
+        raw = [data.get(col, FEATURE_DEFAULTS.get(col, 0)) for col in FEATURE_COLUMNS]
+        total_assets, net_monthly_income, monthly_transactions, high_value_transactions = raw[1], raw[2], raw[3], raw[4]
+        features = np.array(raw + [total_assets / (net_monthly_income + 1),
+                                   monthly_transactions * high_value_transactions], dtype=np.float64)
+        x = (features[self._order] - self._mean) / self._scale
+        return float((x[np.newaxis, :] @ self._coef_t + self._intercept).ravel()[0])
+
+
+def check_parity(scorer: CustomerPriorityScorer, compiled: CompiledPriorityScorer, samples) -> float:
+    """
+    Scores each sample with both paths and returns the largest absolute difference.
+    """
+    return max(abs(scorer.predict(dict(sample)) - compiled.predict(sample)) for sample in samples)
+
+
+def parity_samples(n: int = 50, seed: int = 0) -> list:
+    """
+    Random customers spanning the ranges of the training data, for check_parity.
+    """
+    rng = np.random.default_rng(seed)
+    return [{
+        'Credit Score': int(rng.integers(300, 851)),
+        'Total Assets': int(rng.integers(0, 500001)),
+        'Net Monthly Income': int(rng.integers(0, 200001)),
+        'Monthly Transactions': int(rng.integers(0, 501)),
+        'High-Value Transactions': int(rng.integers(0, 51)),
+        'Sentiment Score': int(rng.integers(0, 101)),
+        'Missed Payments': int(rng.integers(0, 11)),
+        'Fraud Risk': int(rng.integers(0, 2)),
+    } for _ in range(n)]
+
+
 # TRAINING BLOCK: When run as a script, train a simple model and save the scorer.
 if __name__ == "__main__":
     import sys
@@ -134,3 +270,8 @@ if __name__ == "__main__":
     }
     prediction = scorer.predict(sample_data)
     print("Predicted priority score:", prediction)
+    print("Batch priority scores:", predict_batch(scorer, [sample_data] + df[FEATURE_COLUMNS].to_dict("records")))
+
+    # tests/test_priority_model.py checks the compiled fast path against the shipped pickle.
+    compiled = CompiledPriorityScorer(scorer)
+    print("Compiled scorer max difference:", check_parity(scorer, compiled, [sample_data] + parity_samples()))
@@ -1,9 +1,11 @@
-import cv2
 import dlib
 import numpy as np
-from scipy.spatial import distance
 from deepface import DeepFace
 from numpy.linalg import norm
+from liveness import LivenessDetector
+from frame_sampler import sample_frames
+from video_embedding import VideoEmbedder
+from video_verification import verify_video_stream
 
 # IMPORTANT: The model file "shape_predictor_68_face_landmarks.dat" is NOT included in this repository.
 # Due to its large size (~99MB), it must be downloaded manually from the official dlib site:
@@ -16,88 +18,41 @@ from numpy.linalg import norm
 #
 # After downloading, ensure the .dat file is in the same directory as this script.
 
-def eye_aspect_ratio(eye):
-    A = distance.euclidean(eye[1], eye[5])
-    B = distance.euclidean(eye[2], eye[4])
-    C = distance.euclidean(eye[0], eye[3])
-    return (A + B) / (2.0 * C)
-
 # Load face detector and landmark predictor
 detector = dlib.get_frontal_face_detector()
 predictor = dlib.shape_predictor("/content/shape_predictor_68_face_landmarks.dat")
 
-# Eye landmark points (dlib indexes start at 0)
-(left_start, left_end) = (42, 48)
-(right_start, right_end) = (36, 42)
-
-def is_live_video(video_path, ear_threshold=0.25, min_blinks=3, frame_check=100):
-    cap = cv2.VideoCapture(video_path)
-    blink_count = 0
-    total_frames = 0
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        total_frames += 1
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = detector(gray)
-
-        for face in faces:
-            landmarks = predictor(gray, face)
-            left_eye = np.array([(landmarks.part(n).x, landmarks.part(n).y) for n in range(left_start, left_end)])
-            right_eye = np.array([(landmarks.part(n).x, landmarks.part(n).y) for n in range(right_start, right_end)])
-
-            left_ear = eye_aspect_ratio(left_eye)
-            right_ear = eye_aspect_ratio(right_eye)
-            ear = (left_ear + right_ear) / 2.0
-
-            if ear < ear_threshold:
-                blink_count += 1
-
-        if total_frames % frame_check == 0:
-            cap.release()
-            return blink_count >= min_blinks
-
-    cap.release()
-    return False
-
-def extract_frames(video_path, sample_rate=1):
-    cap = cv2.VideoCapture(video_path)
-    frames = []
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_interval = int(fps * sample_rate)
-    count = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if count % frame_interval == 0:
-            frames.append(frame)
-        count += 1
-    cap.release()
-    return frames
-
-def get_video_embedding_facenet(video_path, model_name="Facenet"):
-    frames = extract_frames(video_path, sample_rate=1)
-    if len(frames) == 0:
-        raise ValueError("No frames extracted. Check the video file or sample rate.")
-
-    embeddings = []
-    for frame in frames:
-        try:
-            emb_list = DeepFace.represent(frame, model_name=model_name, enforce_detection=False)
-            if emb_list and len(emb_list) > 0:
-                embeddings.append(np.array(emb_list[0]['embedding']))
-        except Exception as e:
-            # Continue to next frame on error
-            pass
+def is_live_video(video_path, ear_threshold=0.25, min_blinks=3, frame_check=100, frame_stride=1, max_width=320):
+    """
+    Blink-based liveness check on the first `frame_check` frames of the video.
+    Stops as soon as `min_blinks` blinks are seen or can no longer be reached. Every
+    `frame_stride`-th frame is analysed, and faces are detected at `max_width` pixels wide and
+    tracked between frames (see liveness.LivenessDetector).
+    """
+    liveness_detector = LivenessDetector(
+        detector, predictor,
+        ear_threshold=ear_threshold,
+        min_blinks=min_blinks,
+        frame_check=frame_check,
+        frame_stride=frame_stride,
+        max_width=max_width,
+    )
+    return liveness_detector.is_live(video_path)
+
+def extract_frames(video_path, sample_rate=1, max_width=None):
+    """
+    Yields one frame per `sample_rate` seconds of video (see frame_sampler.sample_frames).
+    """
+    yield from sample_frames(video_path, sample_rate=sample_rate, max_width=max_width)
 
-    if len(embeddings) == 0:
-        return None
-    return np.mean(embeddings, axis=0)
+def get_video_embedding_facenet(video_path, model_name="Facenet", sample_rate=1, max_width=None):
+    """
+    Quality-weighted mean embedding of the faces in the video, or None if no usable face is found.
+    Frames are decoded in a background thread while faces are embedded in batches, and sampling
+    stops once the mean embedding has converged (see video_embedding.VideoEmbedder).
+    """
+    frames = extract_frames(video_path, sample_rate=sample_rate, max_width=max_width)
+    return VideoEmbedder(model_name=model_name).embed(frames)
 
 def get_face_embedding(image_path, model_name="Facenet"):
     emb_list = DeepFace.represent(img_path=image_path, model_name=model_name, enforce_detection=False)
@@ -108,30 +63,36 @@ def get_face_embedding(image_path, model_name="Facenet"):
 def cosine_similarity(vec1, vec2):
     return np.dot(vec1, vec2) / (norm(vec1) * norm(vec2))
 
-def run_face_verification(video_path: str, image_path: str) -> dict:
+def run_face_verification(video_path: str, image_path: str, sample_rate=1, frame_stride=1, max_width=320) -> dict:
     """
     Processes the given video and image for liveness detection and facial recognition.
-    1. Performs liveness detection on the video.
-    2. If the video is real, extracts embeddings from both the video and the image.
+    1. Performs liveness detection and video embedding in a single pass over the video: each
+       frame is decoded once and the face box found by the blink tracker is reused for the
+       embedding (see video_verification.verify_video_stream).
+    2. If the video is real, extracts the embedding of the image.
     3. Computes cosine similarity and returns a match decision.
     
     Args:
         video_path: Path to the video file.
         image_path: Path to the image file.
+        sample_rate: Seconds between the frames used for the video embedding.
+        frame_stride: Analyse every `frame_stride`-th frame for blinks.
+        max_width: Width the blink tracker detects faces at.
     
     Returns:
         Dictionary containing the liveness result, cosine similarity (if applicable),
         match result (if applicable), and appropriate messages.
     """
     result = {}
-    # Step 1: Liveness detection
-    live = is_live_video(video_path)
+    # Step 1: Liveness detection and video embedding, in one pass
+    liveness_detector = LivenessDetector(detector, predictor, frame_stride=frame_stride, max_width=max_width)
+    live, video_embedding = verify_video_stream(
+        video_path, liveness_detector, VideoEmbedder(model_name="Facenet"), sample_rate=sample_rate)
     result["liveness"] = live
 
     if live:
         result["liveness_message"] = "Liveness Check Passed: Video is Real"
         # Step 2: Facial Recognition
-        video_embedding = get_video_embedding_facenet(video_path, model_name="Facenet")
         face_embedding = get_face_embedding(image_path, model_name="Facenet")
 
         if video_embedding is None:
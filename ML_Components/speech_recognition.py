@@ -1,13 +1,18 @@
 from resemblyzer import VoiceEncoder, preprocess_wav
-from scipy.spatial.distance import cosine
+from resemblyzer.audio import wav_to_mel_spectrogram, normalize_volume
+from resemblyzer.hparams import sampling_rate, audio_norm_target_dBFS
+import librosa
 import numpy as np
 from speechbrain.inference.speaker import SpeakerRecognition
 import io
 import soundfile as sf
 import os
-import tempfile
+import threading
 import torch
-import torch.nn.functional as F
+from vad import trim_silence, VAD_TRIM_ENABLED
+
+# Minimum cosine similarity for a voice match. Override per deployment with VOICE_MATCH_THRESHOLD.
+VOICE_MATCH_THRESHOLD = float(os.getenv("VOICE_MATCH_THRESHOLD", "0.8"))
 # # ---------- Step 1: Update Your Audio File Paths ----------
 # # ⚠️ Update these paths with the correct filenames you uploaded to Colab
 # reference_audio_path = ""  # Reference voice sample
@@ -61,30 +66,143 @@ import torch.nn.functional as F
 #     print("❌ No Match: The voices are different.")
     
 
-def get_voice_embedding(audio_file:bytes) -> np.ndarray:
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def get_voice_encoder() -> VoiceEncoder:
+    """
+    Returns the process-wide VoiceEncoder, loading its weights on first use.
+    Inference only reads the weights (under torch.no_grad), so threads can share the instance.
+    """
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = VoiceEncoder(device=os.getenv("VOICE_ENCODER_DEVICE") or None, verbose=False)
+    return _encoder
+
+def warm_up_voice_encoder():
+    """
+    Loads the shared encoder and embeds one second of silence.
+    """
+    get_voice_encoder().embed_utterance(np.zeros(16000, dtype=np.float32))
+
+def load_wav(audio_file:bytes) -> np.ndarray:
     audio_stream = io.BytesIO(audio_file)
-    wav, sr = sf.read(audio_stream)
+    wav, sr = sf.read(audio_stream, dtype="float32")
+    if not VAD_TRIM_ENABLED:
+        return preprocess_wav(wav, source_sr=sr)
+    return prepare_wav(wav, source_sr=sr)
+
+def prepare_wav(wav:np.ndarray, source_sr:int=sampling_rate) -> np.ndarray:
+    """
+    Same steps as resemblyzer's preprocess_wav (resample to 16 kHz, normalise the volume, drop
+    silences), but silences are cut with the shared VAD (vad.trim_silence), so the voice encoder
+    and Whisper see the same speech.
+    """
+    if wav.ndim > 1:
+        wav = wav.mean(axis=1)
+    if source_sr != sampling_rate:
+        wav = librosa.resample(wav, orig_sr=source_sr, target_sr=sampling_rate)
+    wav = normalize_volume(wav, audio_norm_target_dBFS, increase_only=True)
+    wav, _ = trim_silence(wav, sampling_rate, stage="voice")
+    return wav
 
-    wav = preprocess_wav(wav, source_sr=sr)
-    encoder= VoiceEncoder()
+def get_voice_embedding(audio_file:bytes) -> np.ndarray:
+    wav = load_wav(audio_file)
+    encoder = get_voice_encoder()
     embedding = encoder.embed_utterance(wav)
     return embedding
 
-def compare_voice_and_embedding(embedding:np.ndarray, audio_file:bytes) -> float:
-    savedir = os.path.join(tempfile.gettempdir(), "spkrec_model")
-    os.makedirs(savedir, exist_ok=True)
-    audio_stream = io.BytesIO(audio_file)
-    wav, sr = sf.read(audio_stream)
-    wav = preprocess_wav(wav, source_sr=sr)
-    encoder= VoiceEncoder()
-    embedding_test = encoder.embed_utterance(wav)
-    cosine_sim = 1 - cosine(embedding, embedding_test)
-    embedding1 = torch.tensor(embedding, dtype=torch.float32)
-    embedding2 = torch.tensor(embedding_test, dtype=torch.float32)
-    score= F.cosine_similarity(embedding1.unsqueeze(0), embedding2.unsqueeze(0))
-    combined_score = (cosine_sim + score) / 2
-    threshold = 0.8
-    if combined_score < threshold:
-        return {"is_match": False, "combined_score": combined_score}
-    else:
-        return {"is_match": True, "combined_score": combined_score}
\ No newline at end of file
+def embed_utterances(wavs, rate=1.3, min_coverage=0.75, max_partials=256) -> np.ndarray:
+    """
+    Embeds many preprocessed utterances with batched forward passes.
+    Follows VoiceEncoder.embed_utterance: every utterance is padded and cut into fixed-size partial
+    windows, but the windows of all utterances are stacked and run through the encoder together
+    (at most `max_partials` per pass). Returns an (n, 256) array of L2-normalised embeddings.
+    """
+    encoder = get_voice_encoder()
+    partial_mels = []
+    partial_counts = []
+    for wav in wavs:
+        wav_slices, mel_slices = encoder.compute_partial_slices(len(wav), rate, min_coverage)
+        max_wave_length = wav_slices[-1].stop
+        if max_wave_length >= len(wav):
+            wav = np.pad(wav, (0, max_wave_length - len(wav)), "constant")
+        mel = wav_to_mel_spectrogram(wav)
+        partial_mels.extend(mel[s] for s in mel_slices)
+        partial_counts.append(len(mel_slices))
+
+    if not partial_mels:
+        return np.empty((0, 256), dtype=np.float32)
+
+    partial_embeds = []
+    with torch.no_grad():
+        for start in range(0, len(partial_mels), max_partials):
+            mels = torch.from_numpy(np.array(partial_mels[start:start + max_partials])).to(encoder.device)
+            partial_embeds.append(encoder(mels).cpu().numpy())
+    partial_embeds = np.concatenate(partial_embeds)
+
+    raw_embeds = np.array([np.mean(group, axis=0)
+                           for group in np.split(partial_embeds, np.cumsum(partial_counts)[:-1])])
+    return raw_embeds / np.linalg.norm(raw_embeds, axis=1, keepdims=True)
+
+def get_voice_embeddings(audio_files) -> np.ndarray:
+    """
+    Batch version of get_voice_embedding for bulk enrollment.
+    """
+    return embed_utterances([load_wav(audio_file) for audio_file in audio_files])
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """
+    Returns the embeddings as an (n, d) float32 array of unit-length rows.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[np.newaxis, :]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, np.finfo(np.float32).eps)
+
+class VoiceVerifier:
+    """
+    Scores utterance embeddings against one or more reference embeddings.
+    The references are normalised once, so each score is a single float32 dot product and N
+    candidates are scored with one matrix-vector product.
+    """
+
+    def __init__(self, references, threshold: float = None):
+        self.references = normalize_embeddings(references)
+        self.threshold = VOICE_MATCH_THRESHOLD if threshold is None else threshold
+
+    def score(self, embedding) -> np.ndarray:
+        """Cosine similarity of the embedding with every reference."""
+        return self.references @ normalize_embeddings(embedding)[0]
+
+    def verify(self, embedding) -> dict:
+        scores = self.score(embedding)
+        best_index = int(np.argmax(scores))
+        return {
+            "is_match": bool(scores[best_index] >= self.threshold),
+            "combined_score": float(scores[best_index]),
+            "best_index": best_index,
+            "scores": scores.tolist(),
+        }
+
+def compare_voice_and_embedding(embedding:np.ndarray, audio_file:bytes, threshold:float=None) -> dict:
+    """
+    Verifies a recording against a stored embedding, or against N candidate embeddings given as an
+    (N, d) array. A single reference returns is_match and combined_score (its cosine similarity);
+    several references also return every candidate's score and the index of the best one.
+    """
+    embedding_test = get_voice_embedding(audio_file)
+    return compare_voice_embeddings(embedding, embedding_test, threshold)
+
+def compare_voice_embeddings(embedding, embedding_test, threshold:float=None) -> dict:
+    """
+    Same as compare_voice_and_embedding, for an utterance that is already embedded.
+    """
+    verifier = VoiceVerifier(embedding, threshold=threshold)
+    result = verifier.verify(embedding_test)
+    if np.ndim(embedding) == 1:
+        return {"is_match": result["is_match"], "combined_score": result["combined_score"]}
+    return result
@@ -0,0 +1,65 @@
+import os
+import sys
+import shutil
+import importlib
+
+import pytest
+
+# The service modules are flat files in ML_Components that import each other by name.
+ML_COMPONENTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_COMPONENTS)
+
+# Modules main.py needs beyond the pure-Python helpers; endpoint tests are skipped without them.
+SERVICE_DEPENDENCIES = ("fastapi", "httpx", "multipart", "dill", "sklearn", "pandas", "cv2", "deepface",
+                        "whisper", "resemblyzer", "speechbrain", "soundfile", "librosa", "torch")
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory):
+    """
+    Imports main.py as the server would (from ML_Components, so the shipped pickles load), with
+    its caches, index and transcript store pointed at a temporary directory. Startup warm-up does
+    not run, since the TestClient is not entered as a context manager.
+    """
+    for module in SERVICE_DEPENDENCIES:
+        pytest.importorskip(module)
+    scratch = tmp_path_factory.mktemp("service")
+    overrides = {
+        "FFMPEG_BINARY": os.environ.get("FFMPEG_BINARY") or shutil.which("ffmpeg") or "ffmpeg",
+        "TRANSCRIPT_CACHE_PATH": str(scratch / "transcripts.sqlite3"),
+        "FACE_INDEX_PATH": str(scratch / "face_index"),
+        "EMBEDDING_CACHE_DIR": "",
+    }
+    saved_env = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    cwd = os.getcwd()
+    os.chdir(ML_COMPONENTS)
+    try:
+        yield importlib.import_module("main")
+    finally:
+        os.chdir(cwd)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@pytest.fixture(scope="session")
+def transcription(main_module):
+    """transcription.py, imported through main_module, which sets FFMPEG_BINARY and the cache paths first."""
+    return importlib.import_module("transcription")
+
+
+@pytest.fixture(scope="session")
+def ffmpeg(transcription):
+    """The configured ffmpeg binary; tests that decode media are skipped without it."""
+    if shutil.which(transcription.ffmpeg_path) is None:
+        pytest.skip(f"ffmpeg not found at {transcription.ffmpeg_path}; set FFMPEG_BINARY")
+    return transcription.ffmpeg_path
+
+
+@pytest.fixture(scope="session")
+def client(main_module):
+    from fastapi.testclient import TestClient
+    return TestClient(main_module.app)
@@ -0,0 +1,53 @@
+import os
+import glob
+import tempfile
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sf = pytest.importorskip("soundfile")
+
+RECORDING = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "record_out.wav")
+
+
+def _scratch_files():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "ticket_media_*")))
+
+
+@pytest.fixture(scope="module")
+def wav_bytes():
+    with open(RECORDING, "rb") as f:
+        return f.read()
+
+
+def test_wav_is_decoded_in_memory(transcription, ffmpeg, wav_bytes):
+    info = sf.info(RECORDING)
+    before = _scratch_files()
+    audio = transcription.decode_audio(wav_bytes, ".wav")
+    assert audio.dtype == np.float32
+    assert len(audio) == pytest.approx(info.duration * transcription.SAMPLE_RATE, abs=transcription.SAMPLE_RATE / 100)
+    assert _scratch_files() == before
+
+
+def test_mp4_is_decoded(transcription, ffmpeg, wav_bytes, tmp_path):
+    mp4_path = str(tmp_path / "call.mp4")
+    subprocess.run([ffmpeg, "-nostdin", "-loglevel", "error", "-i", RECORDING, "-c:a", "aac", mp4_path], check=True)
+    with open(mp4_path, "rb") as f:
+        audio = transcription.decode_audio(f.read(), ".mp4")
+    reference = transcription.decode_audio(wav_bytes, ".wav")
+    assert abs(len(audio) - len(reference)) < transcription.SAMPLE_RATE / 10
+
+
+def test_scratch_file_fallback_cleans_up(transcription, ffmpeg, wav_bytes):
+    # Used for containers ffmpeg cannot read from a pipe (e.g. MP4/MOV with the index at the end).
+    before = _scratch_files()
+    audio = transcription._decode_audio_from_scratch_file(wav_bytes, ".wav", transcription.SAMPLE_RATE)
+    np.testing.assert_array_equal(audio, transcription.decode_audio(wav_bytes, ".wav"))
+    assert _scratch_files() == before
+
+
+def test_undecodable_bytes_give_none(transcription, ffmpeg):
+    before = _scratch_files()
+    assert transcription.decode_audio(b"not media at all", ".wav") is None
+    assert _scratch_files() == before
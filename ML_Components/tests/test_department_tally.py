@@ -0,0 +1,90 @@
+import importlib
+
+import pytest
+
+LOAN = "Loan Services Department"
+DEPOSIT = "Deposit & Account Services Department"
+
+
+@pytest.fixture(scope="module")
+def categorisation(main_module):
+    return importlib.import_module("final_query_categorisation")
+
+
+def test_update_accumulates_counts(categorisation):
+    tally = categorisation.DepartmentTally()
+    tally.update("I need a LOAN")
+    counts = tally.update("another loan please")
+    expected = categorisation.DEPARTMENT_AUTOMATON.count("i need a loan another loan please")
+    assert counts == expected and counts[LOAN] >= 2
+
+
+def test_leader_breaks_ties_like_classify_text(categorisation):
+    tally = categorisation.DepartmentTally()
+    assert tally.leader() == categorisation.classify_text("") == next(iter(categorisation.DEPARTMENT_KEYWORDS))
+    tally.counts[DEPOSIT] = tally.counts[LOAN] = 3
+    assert tally.leader() == max(tally.counts, key=tally.counts.get)
+
+
+def test_settled_is_a_sign_test(categorisation):
+    tally = categorisation.DepartmentTally(z_threshold=3.0, min_hits=5)
+    tally.counts[LOAN] = 4
+    assert not tally.settled()          # (4 - 0) / sqrt(4) = 2
+    tally.counts[LOAN] = 9
+    assert tally.settled()              # (9 - 0) / sqrt(9) = 3
+    tally.counts[DEPOSIT] = 3
+    assert not tally.settled()          # (9 - 3) / sqrt(12) < 3
+    tally = categorisation.DepartmentTally(z_threshold=1.0, min_hits=5)
+    tally.counts[LOAN] = 4
+    assert not tally.settled()          # below min_hits
+
+
+class FakeChunks:
+    """Stands in for transcribe_chunks and records how far it was consumed."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.produced = 0
+        self.closed = False
+
+    def __call__(self, file_data, file_ext, profile=None, language=None):
+        return self._generate()
+
+    def _generate(self):
+        try:
+            for index, text in enumerate(self.texts):
+                self.produced += 1
+                yield {"index": index, "start": index * 30.0, "end": (index + 1) * 30.0, "text": text,
+                       "language": "en"}
+        finally:
+            self.closed = True
+
+
+def test_stream_stops_once_settled(categorisation, monkeypatch):
+    chunks = FakeChunks(["loan loan loan loan loan", "home loan approval loan", "savings account"] * 3)
+    monkeypatch.setattr(categorisation, "transcribe_chunks", chunks)
+    events = list(categorisation.stream_media_query(b"", "call.wav", z_threshold=3.0, min_hits=5))
+    assert [event["event"] for event in events] == ["chunk", "chunk", "result"]
+    assert events[-1]["department"] == LOAN and events[-1]["stopped_early"]
+    assert chunks.produced == 2 and chunks.closed
+
+
+def test_stream_without_early_stop_reads_everything(categorisation, monkeypatch):
+    texts = ["loan loan loan loan loan", "home loan approval loan", "savings account"]
+    chunks = FakeChunks(texts)
+    monkeypatch.setattr(categorisation, "transcribe_chunks", chunks)
+    events = list(categorisation.stream_media_query(b"", "call.wav", early_stop=False))
+    assert chunks.produced == 3
+    assert events[-1] == {"event": "result", "transcribed_text": " ".join(texts), "department": LOAN,
+                          "stopped_early": False}
+
+
+def test_stream_reports_transcription_errors(categorisation, monkeypatch):
+    def failing(*args, **kwargs):
+        raise RuntimeError("decoder crashed")
+        yield
+
+    monkeypatch.setattr(categorisation, "transcribe_chunks", failing)
+    events = list(categorisation.stream_media_query(b"", "call.wav"))
+    assert events[0]["event"] == "error" and "decoder crashed" in events[0]["error"]
+    assert events[-1]["event"] == "result" and not events[-1]["stopped_early"]
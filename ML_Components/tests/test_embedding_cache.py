@@ -0,0 +1,73 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from embedding_cache import EmbeddingCache
+
+MODEL = ("ArcFace/retinaface", "1.0")
+
+
+def test_key_depends_on_bytes_model_and_version():
+    key = EmbeddingCache.key(b"image", *MODEL)
+    assert key == EmbeddingCache.key(b"image", *MODEL)
+    assert key != EmbeddingCache.key(b"other", *MODEL)
+    assert key != EmbeddingCache.key(b"image", MODEL[0], "2.0")
+    assert key != EmbeddingCache.key(b"image", "Resemblyzer", MODEL[1])
+
+
+def test_lookup_miss_then_hit():
+    cache = EmbeddingCache(max_entries=4)
+    key, cached = cache.lookup(b"image", *MODEL)
+    assert cached is None and key == EmbeddingCache.key(b"image", *MODEL)
+    cache.put(key, [0.5, 1.5])
+    _, cached = cache.lookup(b"image", *MODEL)
+    assert cached.dtype == np.float32 and cached.tolist() == [0.5, 1.5]
+    assert not cached.flags.writeable
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_memory_tier_is_lru_bounded():
+    cache = EmbeddingCache(max_entries=2)
+    for name in ("a", "b"):
+        cache.put(name, [1.0])
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", [1.0])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    key, _ = EmbeddingCache(directory=str(tmp_path)).lookup(b"voice", "Resemblyzer", "0.1")
+    EmbeddingCache(directory=str(tmp_path)).put(key, np.arange(3))
+    cache = EmbeddingCache(directory=str(tmp_path))
+    assert cache.get(key).tolist() == [0.0, 1.0, 2.0]
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get(key) is not None and cache.stats()["hits"] == 1
+
+
+def test_unreadable_disk_entry_is_a_miss(tmp_path):
+    cache = EmbeddingCache(directory=str(tmp_path))
+    cache.put("ab" + "0" * 62, [1.0])
+    path = cache._path("ab" + "0" * 62)
+    with open(path, "wb") as f:
+        f.write(b"not numpy")
+    assert EmbeddingCache(directory=str(tmp_path)).get("ab" + "0" * 62) is None
+
+
+def test_voice_batch_only_embeds_cache_misses(client, main_module, monkeypatch):
+    calls = []
+
+    def fake_embeddings(audio_files):
+        calls.append(list(audio_files))
+        return np.stack([np.full(256, len(audio), dtype=np.float32) for audio in audio_files])
+
+    monkeypatch.setattr(main_module, "get_voice_embeddings", fake_embeddings)
+    monkeypatch.setattr(main_module, "embedding_cache", EmbeddingCache(max_entries=16))
+    first = [("audios", ("a.wav", b"a" * 10)), ("audios", ("b.wav", b"b" * 20))]
+    response = client.post("/get_voice_embedding/batch", files=first)
+    assert response.status_code == 200, response.text
+    second = [("audios", ("b.wav", b"b" * 20)), ("audios", ("c.wav", b"c" * 30))]
+    embeddings = client.post("/get_voice_embedding/batch", files=second).json()["embeddings"]
+    assert calls == [[b"a" * 10, b"b" * 20], [b"c" * 30]]
+    assert [embedding[0] for embedding in embeddings] == [20.0, 30.0]
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from embedding_codec import (HEADER, decode_embedding, encode_embedding, encode_embedding_base64,
+                             parse_embedding)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+@pytest.mark.parametrize("shape", [(512,), (3, 128)])
+def test_round_trip(dtype, shape):
+    embedding = np.random.default_rng(0).standard_normal(shape)
+    decoded = decode_embedding(encode_embedding(embedding, dtype))
+    assert decoded.dtype == np.dtype(dtype) and decoded.shape == shape
+    np.testing.assert_array_equal(decoded, embedding.astype(dtype))
+
+
+def test_decode_is_a_read_only_view():
+    data = encode_embedding(np.arange(4, dtype=np.float32))
+    decoded = decode_embedding(data)
+    assert not decoded.flags.writeable
+    assert np.shares_memory(decoded, np.frombuffer(data, dtype=np.uint8))
+    assert len(data) == HEADER.size + 4 * 4
+
+
+def test_unsupported_input_is_rejected():
+    with pytest.raises(ValueError):
+        encode_embedding([1.0, 2.0], dtype="float64")
+    with pytest.raises(ValueError):
+        encode_embedding(np.zeros((2, 2, 2)))
+
+
+def test_malformed_payloads_are_rejected():
+    data = encode_embedding(np.ones(8))
+    with pytest.raises(ValueError, match="too short"):
+        decode_embedding(data[:HEADER.size - 1])
+    with pytest.raises(ValueError, match="Not a binary"):
+        decode_embedding(b"XXXX" + data[4:])
+    with pytest.raises(ValueError, match="does not match"):
+        decode_embedding(data[:-4])
+
+
+def test_parse_embedding_accepts_json_and_base64():
+    values = [0.25, -1.5, 3.0]
+    np.testing.assert_array_equal(parse_embedding(json.dumps(values)), values)
+    np.testing.assert_array_equal(parse_embedding(f"  {encode_embedding_base64(values)}\n"), values)
+    with pytest.raises(ValueError):
+        parse_embedding("not an embedding!")
@@ -0,0 +1,73 @@
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+
+import executors
+from executors import ModelPool, PoolSaturatedError, get_pool, pool_stats, set_pool_initializer, shutdown_pools
+
+_warmed_in = None
+
+
+def _warm_up():
+    global _warmed_in
+    _warmed_in = os.getpid()
+
+
+def _warmed_here():
+    return _warmed_in == os.getpid()
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools(monkeypatch):
+    global _warmed_in
+    _warmed_in = None
+    shutdown_pools()
+    monkeypatch.setattr(executors, "_initializers", {})
+    yield
+    shutdown_pools()
+
+
+def test_full_pool_rejects_jobs():
+    pool = ModelPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        pool.submit(release.wait)
+        pool.submit(release.wait)
+        with pytest.raises(PoolSaturatedError):
+            pool.submit(release.wait)
+        assert pool.stats()["pending"] == 2
+    finally:
+        release.set()
+        pool.shutdown()
+    assert pool.pending == 0
+
+
+def test_process_pool_initializer_runs_in_every_worker(monkeypatch):
+    monkeypatch.setenv("POOL_TEST_KIND", "process")
+    monkeypatch.setenv("POOL_TEST_WORKERS", "2")
+    set_pool_initializer("test", _warm_up)
+    pool = get_pool("test")
+    assert pool_stats()["test"]["warm"] is False
+    start = time.monotonic()
+    pool.warm_up(timeout=60)
+    assert time.monotonic() - start < 60
+    assert pool_stats()["test"] == {"kind": "process", "max_workers": 2, "max_queue": 0, "pending": 0, "warm": True}
+    assert asyncio.run(pool.run(_warmed_here))
+    assert _warmed_in is None  # not loaded in this process
+
+
+def test_thread_pool_initializer_runs_once_in_this_process():
+    set_pool_initializer("test", _warm_up)
+    get_pool("test").warm_up()
+    assert _warmed_in == os.getpid()
+    assert asyncio.run(executors.run_in_pool("test", _warmed_here))
+
+
+def test_metrics_route_lists_the_pools(client):
+    client.post("/query/text", data={"text": "loan"})
+    stats = client.get("/metrics/pools").json()
+    assert stats["text"]["kind"] == "thread"
+    assert {"max_workers", "max_queue", "pending", "warm"} <= set(stats["text"])
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from executors import get_pool, run_in_pool, shutdown_pools
+from face_index import FaceIndex
+
+
+def _embedding(seed, dim=8):
+    return np.random.default_rng(seed).standard_normal(dim)
+
+
+def test_search_ranks_by_cosine_similarity():
+    index = FaceIndex(dim=8)
+    for i in range(5):
+        index.add(f"face-{i}", _embedding(i))
+    matches = index.search(_embedding(3) * 2.5, k=2)
+    assert matches[0][0] == "face-3"
+    assert matches[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert len(matches) == 2 and matches[0][1] >= matches[1][1]
+
+
+def test_add_replaces_and_delete_keeps_rows_dense():
+    index = FaceIndex(dim=8)
+    for i in range(3):
+        index.add(f"face-{i}", _embedding(i))
+    index.add("face-0", _embedding(10))
+    assert len(index) == 3
+    assert index.search(_embedding(10), k=1)[0][0] == "face-0"
+    assert index.delete("face-0") is True
+    assert index.delete("face-0") is False
+    assert {face_id for face_id, _ in index.search(_embedding(0), k=5)} == {"face-1", "face-2"}
+
+
+def test_wrong_dimension_is_rejected():
+    with pytest.raises(ValueError):
+        FaceIndex(dim=8).add("face", np.ones(4))
+
+
+def test_snapshot_and_journal_survive_a_restart(tmp_path):
+    path = str(tmp_path / "faces")
+    index = FaceIndex(path=path, dim=8, compact_every=2)
+    for i in range(3):
+        index.add(f"face-{i}", _embedding(i))  # the second add triggers a snapshot
+    index.delete("face-1")
+    reloaded = FaceIndex(path=path, dim=8)
+    assert len(reloaded) == 2
+    assert reloaded.search(_embedding(2), k=1)[0][0] == "face-2"
+
+
+def test_face_index_pool_stays_in_process(monkeypatch):
+    # The index holds its matrix and lock in this process, so a process pool would update a copy.
+    monkeypatch.setenv("POOL_FACE_INDEX_KIND", "process")
+    shutdown_pools()
+    try:
+        assert get_pool("face_index").kind == "thread"
+        index = FaceIndex(dim=8)
+        asyncio.run(run_in_pool("face_index", index.add, "face", _embedding(0)))
+        assert len(index) == 1
+    finally:
+        shutdown_pools()
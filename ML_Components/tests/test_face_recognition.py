@@ -0,0 +1,68 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("deepface")
+skimage_data = pytest.importorskip("skimage.data")
+
+import face_recognition
+from deepface_batch import extract_face_crops
+
+
+@pytest.fixture(scope="module")
+def portrait():
+    # BGR photo with one frontal face, 512 pixels wide.
+    return np.ascontiguousarray(skimage_data.astronaut()[:, :, ::-1])
+
+
+def _resized(face):
+    return cv2.resize(np.asarray(face, dtype=np.float32), (160, 160))
+
+
+def _deepface_embedding(img, model_name):
+    from deepface import DeepFace
+    try:
+        return np.array(DeepFace.represent(img_path=img, model_name=model_name, enforce_detection=False)[0]["embedding"])
+    except Exception as e:  # the weights are downloaded on first use
+        pytest.skip(f"{model_name} weights unavailable: {e}")
+
+
+def test_min_size_is_scaled_with_the_downscale(monkeypatch):
+    calls = []
+
+    class RecordingCascade:
+        def detectMultiScale(self, gray, **kwargs):
+            calls.append((gray.shape, kwargs["minSize"]))
+            return [(10, 20, 30, 40)]
+
+    monkeypatch.setattr(face_recognition, "get_face_cascade", lambda: RecordingCascade())
+    img = np.zeros((1500, 3000, 3), dtype=np.uint8)
+    assert face_recognition.detect_faces(img, max_width=1000) == [(30, 60, 90, 120)]
+    assert calls[-1] == ((500, 1000), (10, 10))
+    face_recognition.detect_faces(img, max_width=0)
+    assert calls[-1] == ((1500, 3000), (face_recognition.FACE_MIN_SIZE,) * 2)
+
+
+def test_face_region_is_clipped_to_the_image():
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    assert face_recognition.face_region(img, (10, 10, 40, 40)).shape == (70, 70, 3)
+    assert face_recognition.face_region(img, (150, 60, 40, 40)).shape == (60, 70, 3)
+
+
+def test_aligned_face_matches_deepface(portrait):
+    faces = face_recognition.detect_faces(portrait)
+    assert len(faces) == 1
+    aligned = face_recognition.align_face(portrait, faces[0])
+    reference = extract_face_crops(portrait.copy(), detector_backend="opencv", enforce_detection=False)[0]["face"]
+    # The Haar boxes of the full photo and of the face region differ by at most a pixel or two.
+    assert abs(aligned.shape[0] - reference.shape[0]) <= 2
+    assert np.corrcoef(_resized(aligned).ravel(), _resized(reference).ravel())[0, 1] > 0.95
+
+
+def test_embedding_matches_deepface_represent(portrait):
+    reference = _deepface_embedding(portrait.copy(), "Facenet")
+    ok, encoded = cv2.imencode(".png", portrait)
+    result = face_recognition.get_face_embedding(encoded.ravel(), model_name="Facenet")
+    embedding = np.array(result["embedding"])
+    similarity = embedding @ reference / (np.linalg.norm(embedding) * np.linalg.norm(reference))
+    assert similarity > 0.95
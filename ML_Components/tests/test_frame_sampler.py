@@ -0,0 +1,117 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+import frame_sampler
+from frame_sampler import resize_to_width, sample_frames
+
+VideoCapture = cv2.VideoCapture
+
+
+class ScriptedCapture:
+    """Real capture with optional missing metadata; counts the frames it was asked for."""
+
+    def __init__(self, path, fps=None, timestamps=True):
+        self._cap = VideoCapture(path)
+        self._fps = fps
+        self._timestamps = timestamps
+        self.grabs = 0
+        self.released = False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS and self._fps is not None:
+            return self._fps
+        if prop == cv2.CAP_PROP_POS_MSEC and not self._timestamps:
+            return 0.0
+        return self._cap.get(prop)
+
+    def set(self, prop, value):
+        return self._cap.set(prop, value)
+
+    def grab(self):
+        self.grabs += 1
+        return self._cap.grab()
+
+    def retrieve(self):
+        return self._cap.retrieve()
+
+    def read(self):
+        self.grabs += 1
+        return self._cap.read()
+
+    def release(self):
+        self.released = True
+        self._cap.release()
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    # 120 frames at 30 FPS; frame i shows i % 16 on its left half and i // 16 on its right half.
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(120):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:, :32], frame[:, 32:] = 16 * (i % 16), 16 * (i // 16)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class Captures(list):
+    """The captures sample_frames opened, and the metadata they report."""
+
+    def __init__(self, monkeypatch):
+        super().__init__()
+        self.configure()
+        monkeypatch.setattr(frame_sampler.cv2, "VideoCapture", self._open)
+
+    def configure(self, **kwargs):
+        self._kwargs = kwargs
+
+    def _open(self, path):
+        self.append(ScriptedCapture(path, **self._kwargs))
+        return self[-1]
+
+
+@pytest.fixture
+def captures(monkeypatch):
+    return Captures(monkeypatch)
+
+
+def _frame_numbers(frames):
+    return [int(round(frame[:, :32].mean() / 16)) + 16 * int(round(frame[:, 32:].mean() / 16)) for frame in frames]
+
+
+def test_one_frame_per_interval(video_path):
+    assert _frame_numbers(sample_frames(video_path, sample_rate=1.0)) == [0, 30, 60, 90]
+    assert _frame_numbers(sample_frames(video_path, sample_rate=0.5)) == list(range(0, 120, 15))
+
+
+def test_seek_picks_the_same_frames(video_path):
+    assert _frame_numbers(sample_frames(video_path, sample_rate=1.0, seek=True)) == [0, 30, 60, 90]
+
+
+def test_frames_are_downscaled(video_path):
+    frame = next(sample_frames(video_path, max_width=32))
+    assert frame.shape == (24, 32, 3)
+    assert resize_to_width(frame, 64) is frame
+
+
+def test_missing_fps_uses_the_timestamps(video_path, captures):
+    captures.configure(fps=0.0)
+    assert _frame_numbers(sample_frames(video_path, sample_rate=1.0)) == [0, 30, 60, 90]
+
+
+def test_missing_fps_and_timestamps_use_the_fallback_fps(video_path, captures):
+    captures.configure(fps=0.0, timestamps=False)
+    assert _frame_numbers(sample_frames(video_path, sample_rate=1.0, fallback_fps=10.0)) == list(range(0, 120, 10))
+
+
+def test_frames_are_yielded_lazily(video_path, captures):
+    frames = sample_frames(video_path, sample_rate=1.0)
+    assert captures == []  # nothing is opened before the first frame is asked for
+    assert _frame_numbers([next(frames)]) == [0]
+    assert captures[0].grabs == 1
+    frames.close()
+    assert captures[0].released
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from keyword_automaton import KeywordAutomaton
+
+
+def naive_count(keywords_by_label, text):
+    # What classify_text computed before the automaton: str.count per keyword, summed per label.
+    return {label: sum(text.count(keyword) for keyword in set(keywords) if keyword)
+            for label, keywords in keywords_by_label.items()}
+
+
+def test_counts_follow_str_count():
+    keywords = {"loan": ["loan", "loan approval", "home loan"], "card": ["card", "debit card", "lost card"]}
+    automaton = KeywordAutomaton(keywords)
+    text = "home loan approval for my loan; lost card and debit card, card card"
+    assert automaton.count(text) == naive_count(keywords, text) == {"loan": 4, "card": 6}
+
+
+def test_same_keyword_does_not_overlap():
+    automaton = KeywordAutomaton({"a": ["aa"], "b": ["aba"]})
+    assert automaton.count("aaaa") == {"a": 2, "b": 0}
+    assert automaton.count("ababa") == {"a": 0, "b": 1}
+
+
+def test_shared_keyword_counts_for_every_label():
+    automaton = KeywordAutomaton({"x": ["fraud"], "y": ["fraud", "fraud"], "z": [""]})
+    assert automaton.count("fraud fraud") == {"x": 2, "y": 2, "z": 0}
+
+
+def test_whole_words():
+    automaton = KeywordAutomaton({"loan": ["loan"]})
+    assert automaton.count("loaning a loan, loan.") == {"loan": 3}
+    assert automaton.count("loaning a loan, loan.", whole_words=True) == {"loan": 2}
+
+
+def test_matches_naive_counting_on_random_text():
+    rng = random.Random(0)
+    alphabet = "ab "
+    keywords = {label: ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(5)]
+                for label in ("p", "q", "r")}
+    automaton = KeywordAutomaton(keywords)
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert automaton.count(text) == naive_count(keywords, text), text
+
+
+def test_department_classification_is_unchanged(transcription):
+    from final_query_categorisation import DEPARTMENT_KEYWORDS, classify_text, classify_texts
+    texts = [
+        "I want to know the EMI and interest rate on my home loan",
+        "my debit card was blocked and there is an unauthorized transaction, please help, this is fraud",
+        "please update my address and mobile number in the account",
+        "",
+    ]
+    for text in texts:
+        counts = naive_count(DEPARTMENT_KEYWORDS, text.lower())
+        assert classify_text(text) == max(counts, key=counts.get)
+    assert classify_texts(texts) == [classify_text(text) for text in texts]
@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+distance = pytest.importorskip("scipy.spatial.distance")
+
+from landmarks import (eye_aspect_ratio, eye_aspect_ratios, left_end, left_start, mean_eye_aspect_ratio,
+                       right_end, right_start, shape_to_array, shapes_to_array)
+
+
+def reference_ear(eye):
+    # The per-point calculation eye_aspect_ratio replaced.
+    A = distance.euclidean(eye[1], eye[5])
+    B = distance.euclidean(eye[2], eye[4])
+    C = distance.euclidean(eye[0], eye[3])
+    return (A + B) / (2.0 * C)
+
+
+@pytest.fixture(scope="module")
+def faces():
+    # Five fixed sets of 68 landmarks: integer pixel positions, as dlib's predictor returns them.
+    return np.random.default_rng(7).integers(0, 640, size=(5, 68, 2)).astype(np.float64)
+
+
+def test_ears_match_the_per_point_calculation(faces):
+    expected = np.array([[reference_ear(face[right_start:right_end]), reference_ear(face[left_start:left_end])]
+                         for face in faces])
+    np.testing.assert_allclose(eye_aspect_ratios(faces), expected, rtol=1e-12)
+    np.testing.assert_allclose(eye_aspect_ratios(faces[0]), expected[0], rtol=1e-12)
+    np.testing.assert_allclose(mean_eye_aspect_ratio(faces), expected.mean(axis=1), rtol=1e-12)
+    assert eye_aspect_ratio(faces[0][left_start:left_end]) == pytest.approx(expected[0, 1], rel=1e-12)
+
+
+def test_open_and_closed_eye():
+    open_eye = [(0, 0), (1, -1), (2, -1), (3, 0), (2, 1), (1, 1)]
+    closed_eye = [(0, 0), (1, -0.1), (2, -0.1), (3, 0), (2, 0.1), (1, 0.1)]
+    assert eye_aspect_ratio(open_eye) == pytest.approx(2 / 3)
+    assert eye_aspect_ratio(closed_eye) == pytest.approx(0.2 / 3)
+
+
+def test_shape_to_array_reads_dlib_shapes(faces):
+    dlib = pytest.importorskip("dlib")
+    shapes = [dlib.full_object_detection(dlib.rectangle(0, 0, 640, 640),
+                                         dlib.points([dlib.point(int(x), int(y)) for x, y in face]))
+              for face in faces]
+    np.testing.assert_array_equal(shape_to_array(shapes[0]), faces[0])
+    np.testing.assert_array_equal(shapes_to_array(shapes), faces)
+    assert shapes_to_array([]).shape == (0, 68, 2)
@@ -0,0 +1,89 @@
+import copy
+import random
+import itertools
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("dlib")
+
+from liveness import BlinkCounter, LivenessDetector
+
+OPEN, CLOSED = 0.3, 0.1
+
+
+def _counter(ears, min_closed_frames=1):
+    counter = BlinkCounter(ear_threshold=0.25, min_closed_frames=min_closed_frames)
+    completed = [counter.update(ear) for ear in ears]
+    return counter, completed
+
+
+def test_a_blink_is_counted_when_the_eyes_open_again():
+    counter, completed = _counter([OPEN, CLOSED, CLOSED, OPEN, OPEN, CLOSED, OPEN])
+    assert counter.blinks == 2
+    assert completed == [False, False, False, True, False, False, True]
+
+
+def test_short_closures_are_not_blinks():
+    counter, _ = _counter([OPEN, CLOSED, OPEN, CLOSED, CLOSED, OPEN], min_closed_frames=2)
+    assert counter.blinks == 1
+
+
+def test_a_lost_face_resets_the_closure():
+    counter, _ = _counter([CLOSED, None, OPEN, CLOSED, CLOSED, None, OPEN])
+    assert counter.blinks == 0 and counter.closed_frames == 0
+
+
+def _detector(min_blinks, frame_budget, frame_stride, min_closed_frames):
+    detector = LivenessDetector(None, None, min_blinks=min_blinks, frame_check=frame_budget,
+                                frame_stride=frame_stride, min_closed_frames=min_closed_frames)
+    detector.start()
+    return detector
+
+
+def _can_still_pass(detector, next_frame_index):
+    """Brute force: does any sequence of EARs over the remaining analysed frames reach min_blinks?"""
+    remaining = sum(1 for index in range(next_frame_index, detector.frame_budget) if detector.should_process(index))
+    for ears in itertools.product((OPEN, CLOSED), repeat=remaining):
+        counter = copy.copy(detector.blink_counter)
+        for ear in ears:
+            counter.update(ear)
+        if counter.blinks >= detector.min_blinks:
+            return True
+    return detector.blink_counter.blinks >= detector.min_blinks
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_decision_is_settled_exactly_when_the_outcome_is_known(seed):
+    rng = random.Random(seed)
+    detector = _detector(min_blinks=rng.randint(1, 3), frame_budget=rng.randint(4, 14),
+                         frame_stride=rng.randint(1, 3), min_closed_frames=rng.randint(1, 2))
+    next_frame_index = rng.randint(0, detector.frame_budget)
+    for frame_index in range(next_frame_index):
+        if detector.should_process(frame_index):
+            detector.blink_counter.update(rng.choice((OPEN, CLOSED, None)))
+
+    decision = detector.decision(next_frame_index)
+    if detector.blink_counter.blinks >= detector.min_blinks:
+        assert decision is True
+    else:
+        # A spoof is only declared once no sequence of remaining frames could still pass, and
+        # the check stops as soon as that is the case.
+        assert decision is (None if _can_still_pass(detector, next_frame_index) else False)
+
+
+def test_budget_follows_the_video_length():
+    detector = _detector(min_blinks=3, frame_budget=100, frame_stride=1, min_closed_frames=1)
+    detector.start(total_frames=40)
+    assert detector.frame_budget == 40
+    detector.start(total_frames=None)
+    assert detector.frame_budget == 100
+
+
+def test_early_exit_with_a_stride():
+    # 3 blinks of 2 analysed frames each need 6 analysed frames; with stride 4 and a 24-frame
+    # budget there are exactly 6 (frames 0, 4, ..., 20).
+    detector = _detector(min_blinks=3, frame_budget=24, frame_stride=4, min_closed_frames=1)
+    assert detector.decision(0) is None
+    detector.blink_counter.update(OPEN)
+    assert detector.decision(1) is False
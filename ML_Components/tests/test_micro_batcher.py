@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from executors import shutdown_pools
+from micro_batcher import MicroBatcher
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    shutdown_pools()
+    yield
+    shutdown_pools()
+
+
+class Recorder:
+    """Batch function that remembers the batches it was called with."""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [item * 10 for item in items]
+
+
+def _submit_all(batcher, items):
+    async def main():
+        return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+    return asyncio.run(main())
+
+
+def test_full_batch_is_processed_at_once():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, "test", max_batch_size=4, max_wait_ms=10_000)
+    assert _submit_all(batcher, [1, 2, 3, 4]) == [10, 20, 30, 40]
+    assert recorder.batches == [[1, 2, 3, 4]]
+
+
+def test_partial_batch_is_flushed_after_the_wait():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, "test", max_batch_size=8, max_wait_ms=5)
+    assert _submit_all(batcher, [1, 2, 3]) == [10, 20, 30]
+    assert recorder.batches == [[1, 2, 3]]
+
+
+def test_overflow_starts_a_new_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, "test", max_batch_size=2, max_wait_ms=5)
+    assert _submit_all(batcher, [1, 2, 3, 4, 5]) == [10, 20, 30, 40, 50]
+    assert sorted(recorder.batches) == [[1, 2], [3, 4], [5]]
+
+
+def test_failed_batch_fails_every_caller():
+    batcher = MicroBatcher(Recorder(fail=True), "test", max_batch_size=2, max_wait_ms=5)
+    results = _submit_all(batcher, [1, 2])
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_no_tasks_are_left_behind():
+    batcher = MicroBatcher(Recorder(), "test", max_batch_size=2, max_wait_ms=5)
+    _submit_all(batcher, [1, 2, 3])
+    assert batcher._waiting == [] and batcher._timer is None and not batcher._tasks
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from model_lifecycle import FAILED, PENDING, READY, ModelLifecycle
+
+
+def _fail():
+    raise RuntimeError("weights not found")
+
+
+@pytest.fixture
+def lifecycle(main_module, monkeypatch):
+    """A fresh lifecycle behind /healthz/ready, with stub warm-ups instead of the real models."""
+    lifecycle = ModelLifecycle()
+    monkeypatch.setattr(main_module, "lifecycle", lifecycle)
+    return lifecycle
+
+
+def test_not_ready_before_warm_up(client, lifecycle):
+    lifecycle.register("face", lambda: None)
+    response = client.get("/healthz/ready")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False, "components": {
+        "face": {"status": PENDING, "required": True, "seconds": None, "error": None}}}
+
+
+def test_ready_after_a_successful_warm_up(client, lifecycle):
+    calls = []
+    lifecycle.register("face", lambda: calls.append("face"))
+    lifecycle.register("voice", lambda: calls.append("voice"))
+    lifecycle.warm_up_all()
+    response = client.get("/healthz/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True and calls == ["face", "voice"]
+    assert all(component["status"] == READY for component in response.json()["components"].values())
+
+
+def test_not_ready_after_a_failed_warm_up(client, lifecycle):
+    lifecycle.register("face", lambda: None)
+    lifecycle.register("voice", _fail)
+    lifecycle.warm_up_all()
+    response = client.get("/healthz/ready")
+    assert response.status_code == 503
+    voice = response.json()["components"]["voice"]
+    assert voice["status"] == FAILED and voice["error"] == "weights not found"
+
+    # A retried warm-up that succeeds makes the worker ready.
+    lifecycle.register("voice", lambda: None)
+    lifecycle.warm_up("voice")
+    assert client.get("/healthz/ready").status_code == 200
+
+
+def test_optional_components_do_not_block_readiness(client, lifecycle):
+    lifecycle.register("face", lambda: None)
+    lifecycle.register("extra", _fail, required=False)
+    lifecycle.warm_up_all()
+    assert client.get("/healthz/ready").status_code == 200
+
+
+def test_background_warm_up(client, lifecycle):
+    release = threading.Event()
+    lifecycle.register("face", release.wait)
+    thread = lifecycle.start_background_warm_up()
+    try:
+        assert client.get("/healthz/live").status_code == 200
+        assert client.get("/healthz/ready").status_code == 503
+    finally:
+        release.set()
+        thread.join(timeout=5)
+    assert client.get("/healthz/ready").status_code == 200
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+dill = pytest.importorskip("dill")
+
+from priority_model import (CompiledPriorityScorer, FEATURE_COLUMNS, check_parity, parity_samples,
+                            predict_batch)
+
+PICKLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "customer_priority_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def shipped_scorer():
+    with open(PICKLE_PATH, "rb") as f:
+        return dill.load(f)
+
+
+def test_shipped_scorer_is_the_pickled_class_body(shipped_scorer):
+    # The batch and compiled paths must not rely on methods added to the class after the pickle.
+    assert not hasattr(shipped_scorer, "predict_batch")
+    assert shipped_scorer.model is not None
+
+
+def test_predict_batch_matches_predict(shipped_scorer):
+    samples = parity_samples(n=25, seed=1)
+    batch = predict_batch(shipped_scorer, samples)
+    reference = np.array([shipped_scorer.predict(dict(sample)) for sample in samples])
+    np.testing.assert_allclose(batch, reference, rtol=1e-12, atol=1e-9)
+
+
+def test_predict_batch_accepts_a_matrix(shipped_scorer):
+    samples = parity_samples(n=5, seed=2)
+    matrix = np.array([[sample[col] for col in FEATURE_COLUMNS] for sample in samples], dtype=np.float64)
+    np.testing.assert_array_equal(predict_batch(shipped_scorer, matrix), predict_batch(shipped_scorer, samples))
+
+
+def test_predict_batch_of_nothing(shipped_scorer):
+    assert predict_batch(shipped_scorer, []).shape == (0,)
+
+
+def test_predict_batch_rejects_wrong_width(shipped_scorer):
+    with pytest.raises(ValueError):
+        predict_batch(shipped_scorer, np.zeros((2, 3)))
+
+
+def test_prioritization_batch_endpoint(client):
+    samples = parity_samples(n=3, seed=3)
+    response = client.post("/prioritization/batch", json=samples)
+    assert response.status_code == 200, response.text
+    scores = response.json()["priority_scores"]
+    assert len(scores) == 3
+    single = [client.post("/prioritization", json=sample).json()["priority_score"] for sample in samples]
+    np.testing.assert_allclose(scores, single, rtol=1e-12, atol=1e-9)
+
+
+def test_prioritization_batch_endpoint_reports_missing_fields(client):
+    sample = parity_samples(n=1)[0]
+    del sample["Fraud Risk"]
+    response = client.post("/prioritization/batch", json=[sample])
+    assert response.status_code == 400
+    assert "item 0" in response.json()["error"]
+
+
+def test_compiled_scorer_matches_shipped_scorer(shipped_scorer):
+    compiled = CompiledPriorityScorer(shipped_scorer)
+    assert check_parity(shipped_scorer, compiled, parity_samples(n=200, seed=4)) == 0.0
+
+
+def test_compiled_scorer_uses_missing_value_defaults(shipped_scorer):
+    compiled = CompiledPriorityScorer(shipped_scorer)
+    sample = parity_samples(n=1, seed=5)[0]
+    del sample["Sentiment Score"]
+    assert compiled.predict(sample) == compiled.predict({**sample, "Sentiment Score": 50})
+
+
+def test_compiled_scorer_rejects_non_linear_models(shipped_scorer):
+    class Unfitted:
+        model = object()
+        feature_scaler = shipped_scorer.feature_scaler
+
+    with pytest.raises(ValueError):
+        CompiledPriorityScorer(Unfitted())
+
+
+def test_service_uses_compiled_scorer(main_module):
+    # Startup compiles the shipped pickle and keeps it only if it passed the parity check.
+    assert main_module.compiled_priority_scorer is not None
@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+for module in ("torch", "resemblyzer", "speechbrain", "librosa", "soundfile"):
+    pytest.importorskip(module)
+
+import speech_recognition
+from speech_recognition import (VoiceVerifier, compare_voice_embeddings, embed_utterances, get_voice_encoder,
+                                normalize_embeddings)
+
+RATE = 16000
+
+
+def _utterance(seconds, seed):
+    # Harmonic "voice" with a syllable-rate envelope and a little noise, at a speaker-specific pitch.
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * RATE)) / RATE
+    f0 = 100 + 20 * seed
+    wav = sum(np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, np.pi)) / k for k in range(1, 12))
+    wav = wav * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t)) + 0.01 * rng.standard_normal(len(t))
+    return (0.3 * wav / np.abs(wav).max()).astype(np.float32)
+
+
+def test_encoder_is_shared():
+    encoders = []
+    threads = [threading.Thread(target=lambda: encoders.append(get_voice_encoder())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(encoder is get_voice_encoder() for encoder in encoders)
+
+
+def test_batched_embeddings_match_embed_utterance():
+    # Lengths below one partial window, around it and several windows long.
+    wavs = [_utterance(seconds, seed) for seed, seconds in enumerate((0.5, 1.6, 3.0, 7.5))]
+    encoder = get_voice_encoder()
+    expected = np.array([encoder.embed_utterance(wav) for wav in wavs])
+    np.testing.assert_allclose(embed_utterances(wavs), expected, atol=1e-6)
+    # Partial windows of one utterance may be split across forward passes.
+    np.testing.assert_allclose(embed_utterances(wavs, max_partials=3), expected, atol=1e-6)
+    assert embed_utterances([]).shape == (0, 256)
+
+
+def test_single_reference_returns_plain_floats():
+    reference = np.array([1.0, 0.0, 0.0])
+    result = compare_voice_embeddings(reference, np.array([3.0, 4.0, 0.0]), threshold=0.5)
+    assert result == {"is_match": True, "combined_score": pytest.approx(0.6)}
+    assert type(result["combined_score"]) is float and type(result["is_match"]) is bool
+    assert compare_voice_embeddings(reference, [0.0, 1.0, 0.0], threshold=0.5)["is_match"] is False
+
+
+def test_candidates_are_scored_together():
+    candidates = np.array([[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]])
+    result = compare_voice_embeddings(candidates, np.array([0.1, 1.0]), threshold=0.9)
+    assert result["best_index"] == 1 and result["is_match"] is True
+    expected = normalize_embeddings(candidates) @ normalize_embeddings([0.1, 1.0])[0]
+    np.testing.assert_allclose(result["scores"], expected, rtol=1e-6)
+    assert all(type(score) is float for score in result["scores"])
+    assert result["combined_score"] == pytest.approx(max(expected))
+
+
+def test_default_threshold(monkeypatch):
+    monkeypatch.setattr(speech_recognition, "VOICE_MATCH_THRESHOLD", 0.95)
+    assert VoiceVerifier([1.0, 0.0]).threshold == 0.95
+    assert VoiceVerifier([1.0, 0.0], threshold=0.5).threshold == 0.5
+    assert compare_voice_embeddings(np.array([1.0, 0.0]), np.array([0.9, 0.3]))["is_match"] is False
+
+
+def test_threshold_can_be_set_per_deployment():
+    env = {**os.environ, "VOICE_MATCH_THRESHOLD": "0.65"}
+    output = subprocess.run(
+        [sys.executable, "-c", "import speech_recognition; print(speech_recognition.VOICE_MATCH_THRESHOLD)"],
+        cwd=os.path.dirname(os.path.abspath(speech_recognition.__file__)), env=env,
+        capture_output=True, text=True, check=True).stdout
+    assert float(output.strip().splitlines()[-1]) == 0.65
@@ -0,0 +1,50 @@
+import json
+
+LOAN_TEXT = "I want to know the interest rate on my home loan and the EMI schedule."
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def test_json_array_batch(client):
+    response = client.post("/query/text/batch", json=[LOAN_TEXT, {"id": 7, "text": LOAN_TEXT}, {"id": 8}])
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = _lines(response)
+    assert len(results) == 3
+    assert results[0] == {"transcribed_text": LOAN_TEXT, "department": "Loan Services Department"}
+    assert results[1]["id"] == 7 and results[1]["department"] == "Loan Services Department"
+    assert results[2]["id"] == 8 and "error" in results[2]
+
+
+def test_ndjson_batch(client):
+    body = "\n".join(json.dumps({"id": i, "text": LOAN_TEXT}) for i in range(3)) + "\n\n"
+    response = client.post("/query/text/batch", content=body,
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200, response.text
+    assert [result["id"] for result in _lines(response)] == [0, 1, 2]
+
+
+def test_chunked_batch_keeps_order(client, main_module, monkeypatch):
+    monkeypatch.setattr(main_module, "TEXT_BATCH_CHUNK_SIZE", 2)
+    items = [{"id": i, "text": LOAN_TEXT} for i in range(5)]
+    response = client.post("/query/text/batch", json=items)
+    assert [result["id"] for result in _lines(response)] == list(range(5))
+
+
+def test_invalid_body_is_rejected_before_streaming(client):
+    response = client.post("/query/text/batch", content=b"[not json",
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+    response = client.post("/query/text/batch", json={"text": LOAN_TEXT})
+    assert response.status_code == 400
+
+
+def test_oversized_body_is_rejected(client, main_module, monkeypatch):
+    monkeypatch.setattr(main_module, "TEXT_BATCH_MAX_BYTES", 64)
+    response = client.post("/query/text/batch", json=[LOAN_TEXT] * 10)
+    assert response.status_code == 413
+    assert "error" in response.json()
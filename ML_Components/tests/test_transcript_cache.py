@@ -0,0 +1,139 @@
+import sqlite3
+import itertools
+
+import pytest
+
+import transcript_cache as transcript_cache_module
+from transcript_cache import TranscriptCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Distinct, increasing timestamps so the LRU order does not depend on the clock resolution.
+    ticks = itertools.count(1)
+
+    class Clock:
+        @staticmethod
+        def time():
+            return float(next(ticks))
+
+    monkeypatch.setattr(transcript_cache_module, "time", Clock)
+
+
+def test_key_covers_media_and_options():
+    key = TranscriptCache.key(b"audio", "small", "translate", "1.0")
+    assert key == TranscriptCache.key(b"audio", "small", "translate", "1.0")
+    assert len({key,
+                TranscriptCache.key(b"audio!", "small", "translate", "1.0"),
+                TranscriptCache.key(b"audio", "medium", "translate", "1.0"),
+                TranscriptCache.key(b"audio", "small", "transcribe", "1.0"),
+                TranscriptCache.key(b"audio", "small", "translate", "1.1")}) == 5
+
+
+def test_get_put_and_hits(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("missing") is None
+    cache.put("k", "hello world", "en")
+    assert cache.get("k") == "hello world"
+    assert cache.get("k") == "hello world"
+    assert cache.stats() == {"entries": 1, "bytes": 11, "max_bytes": cache.max_bytes, "hits": 2}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"     # "b" is now the least recently used
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa" and cache.get("c") == "cccc"
+    assert cache.stats()["bytes"] == 8
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    TranscriptCache(path).put("k", "persisted")
+    assert TranscriptCache(path).get("k") == "persisted"
+
+
+def test_process_file_uses_the_cache(transcription, tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    import vad
+
+    calls = []
+
+    def fake_transcribe(audio, options, **kwargs):
+        calls.append(options)
+        return {"text": f"transcript {len(calls)}", "language": "en"}
+
+    monkeypatch.setattr(transcription, "transcript_cache", TranscriptCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(transcription, "decode_audio", lambda data, ext: np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr(transcription, "transcribe_audio", fake_transcribe)
+    monkeypatch.setattr(transcription, "VAD_TRIM_ENABLED", False)
+
+    assert transcription.process_file(b"media", ".wav") == "transcript 1"
+    assert transcription.process_file(b"media", ".wav") == "transcript 1"
+    assert len(calls) == 1
+
+    # Other VAD settings change the audio Whisper sees, so they must not hit the old entry.
+    monkeypatch.setattr(vad, "THRESHOLD_DB", vad.THRESHOLD_DB - 5)
+    monkeypatch.setattr(vad, "VAD_TRIM_ENABLED", True)
+    assert transcription.process_file(b"media", ".wav") == "transcript 2"
+    assert len(calls) == 2
+
+
+def test_stats_survive_database_errors(tmp_path, monkeypatch):
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+
+    def broken_connection():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "_connection", broken_connection)
+    assert cache.stats() == {"entries": None, "bytes": None, "max_bytes": cache.max_bytes, "hits": None}
+    assert cache.get("k") is None
+
+
+@pytest.fixture
+def cached_upload(transcription, tmp_path, monkeypatch):
+    """An upload whose transcript is cached, with the transcription workers refusing every job."""
+    cache = TranscriptCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(transcription, "transcript_cache", cache)
+    data = b"previously transcribed media"
+    options = transcription.resolve_decoding_options(None, language="hi")
+    cache.put(transcription.transcript_cache_key(data, options), "What is the interest rate on my home loan?")
+
+    import transcription_jobs
+    from executors import PoolSaturatedError
+
+    def saturated(*args, **kwargs):
+        raise PoolSaturatedError("busy")
+
+    monkeypatch.setattr(transcription_jobs.transcription_jobs, "submit", saturated)
+    return data
+
+
+def test_query_file_is_answered_from_the_cache(client, cached_upload):
+    files = {"file": ("call.wav", cached_upload, "audio/wav")}
+    response = client.post("/query/file", files=files, data={"language": "Hindi"})
+    assert response.status_code == 200, response.text
+    assert response.json() == {"transcribed_text": "What is the interest rate on my home loan?",
+                               "department": "Loan Services Department"}
+
+    # A miss still goes to the (saturated) workers.
+    response = client.post("/query/file", files={"file": ("call.wav", b"new media", "audio/wav")})
+    assert response.status_code == 503
+
+
+def test_cached_job_is_done_at_once(client, cached_upload):
+    response = client.post("/query/file/jobs", files={"file": ("call.wav", cached_upload, "audio/wav")},
+                           data={"language": "hi"})
+    assert response.status_code == 202, response.text
+    assert response.json()["status"] == "done"
+    job = client.get(f"/query/file/jobs/{response.json()['job_id']}").json()
+    assert job["result"]["department"] == "Loan Services Department"
+
+
+def test_transcript_cache_metrics(client, cached_upload):
+    response = client.get("/metrics/transcript_cache")
+    assert response.status_code == 200
+    assert response.json()["enabled"] is True
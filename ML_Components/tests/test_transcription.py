@@ -0,0 +1,87 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+
+def test_language_code_accepts_codes_and_names(transcription):
+    assert transcription.language_code("hi") == "hi"
+    assert transcription.language_code(" Hindi ") == "hi"
+    assert transcription.language_code("Marathi") == "mr"
+    assert transcription.language_code("klingon") is None
+
+
+def test_resolve_decoding_options_normalises_the_language(transcription):
+    assert transcription.resolve_decoding_options("fast", language="English")["language"] == "en"
+    assert transcription.resolve_decoding_options("fast")["language"] is None
+    with pytest.raises(ValueError):
+        transcription.resolve_decoding_options("fast", language="xx")
+    with pytest.raises(ValueError):
+        transcription.resolve_decoding_options("fastest")
+
+
+def test_model_nbytes_counts_packed_int8_weights(transcription):
+    model = torch.nn.Sequential(torch.nn.Linear(256, 256), torch.nn.ReLU(), torch.nn.Linear(256, 64))
+    model.register_buffer("positions", torch.zeros(10, 256))
+    weights = 256 * 256 + 256 * 64
+    biases = 256 + 64
+    buffer_bytes = 10 * 256 * 4
+    assert transcription._model_nbytes(model) == (weights + biases) * 4 + buffer_bytes
+
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    nbytes = transcription._model_nbytes(quantized)
+    assert nbytes >= weights + biases * 4 + buffer_bytes
+    assert nbytes < (weights + biases) * 4
+
+
+@pytest.mark.parametrize("route", ["/query/file", "/query/file/jobs", "/query/file/stream"])
+def test_unknown_language_is_rejected(client, route):
+    response = client.post(route, files={"file": ("call.wav", b"RIFF")}, data={"language": "klingon"})
+    assert response.status_code == 400
+    assert "klingon" in response.json()["error"]
+
+
+def test_unknown_profile_is_rejected(client):
+    response = client.post("/query/file", files={"file": ("call.wav", b"RIFF")}, data={"profile": "fastest"})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def fake_loader(transcription, monkeypatch):
+    # Stands in for whisper.load_model, which downloads the checkpoint: 1 MiB of weights per size.
+    loads = []
+
+    def load_model(model_size, device=None):
+        loads.append(model_size)
+        return torch.nn.Linear(512, 512, bias=False)
+
+    monkeypatch.setattr(transcription.whisper, "load_model", load_model)
+    return loads
+
+
+def test_registry_loads_each_model_once(transcription, fake_loader):
+    registry = transcription.WhisperModelRegistry()
+    model = registry.get("base")
+    assert registry.get("base") is model
+    assert fake_loader == ["base"]
+    assert registry.memory_usage() == 512 * 512 * 4
+
+
+def test_registry_loads_once_under_concurrency(transcription, fake_loader):
+    from concurrent.futures import ThreadPoolExecutor
+    registry = transcription.WhisperModelRegistry()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        models = list(executor.map(lambda _: registry.get("small"), range(16)))
+    assert fake_loader == ["small"]
+    assert all(model is models[0] for model in models)
+
+
+def test_registry_evicts_least_recently_used_over_budget(transcription, fake_loader):
+    registry = transcription.WhisperModelRegistry(memory_budget_mb=2)
+    registry.get("tiny")
+    registry.get("base")
+    registry.get("tiny")  # "base" is now the least recently used
+    registry.get("small")
+    assert registry.loaded_sizes() == ["tiny", "small"]
+    assert registry.evict("tiny") and not registry.evict("tiny")
+    assert registry.loaded_sizes() == ["small"]
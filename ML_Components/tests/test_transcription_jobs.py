@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import transcription_jobs
+from executors import PoolSaturatedError
+from transcription_jobs import FALLBACK_RESULT, TranscriptionJobQueue, _trim_stats_delta
+from vad import trim_stats
+
+# Jobs run in a thread pool here: the worker processes would load Whisper. The job function is
+# replaced per test, which is what a worker process would have returned or raised.
+
+
+@pytest.fixture
+def queue():
+    queue = TranscriptionJobQueue(workers=1, max_pending=2)
+    queue._executor = ThreadPoolExecutor(max_workers=1)
+    yield queue
+    queue.shutdown()
+
+
+def test_result_and_worker_trim_stats_reach_the_parent(queue, monkeypatch):
+    result = {"transcribed_text": "loan emi", "department": "Loan Services Department"}
+    delta = {"transcription-test": {"calls": 1, "original_seconds": 4.0, "removed_seconds": 1.5}}
+    monkeypatch.setattr(transcription_jobs, "_run_job", lambda *args: (result, delta))
+    before = trim_stats().get("transcription-test", {"calls": 0, "removed_seconds": 0.0})
+
+    assert asyncio.run(queue.run(b"audio", "call.wav")) == result
+    after = trim_stats()["transcription-test"]
+    assert after["calls"] == before["calls"] + 1
+    assert after["removed_seconds"] == pytest.approx(before["removed_seconds"] + 1.5)
+    assert queue.stats()["completed"] == 1
+
+
+def test_dead_worker_returns_the_fallback(queue, monkeypatch):
+    def dying_worker(*args):
+        raise BrokenProcessPool("A process in the process pool was terminated abruptly.")
+
+    monkeypatch.setattr(transcription_jobs, "_run_job", dying_worker)
+    executor = queue._executor
+    assert asyncio.run(queue.run(b"audio", "call.wav")) == FALLBACK_RESULT
+    # The broken pool is dropped, so the next job starts a fresh one.
+    assert queue._executor is not executor
+    assert queue.stats()["failed"] == 1
+
+
+def test_failing_job_returns_the_fallback(queue, monkeypatch):
+    def failing_worker(*args):
+        raise MemoryError("out of memory")
+
+    monkeypatch.setattr(transcription_jobs, "_run_job", failing_worker)
+    result = asyncio.run(queue.run(b"audio", "call.wav"))
+    assert result == FALLBACK_RESULT and result is not FALLBACK_RESULT
+    job = next(iter(queue._jobs.values()))
+    assert job.to_dict()["status"] == "failed"
+
+
+def test_saturated_queue_is_still_rejected(queue):
+    queue.max_pending = 0
+    with pytest.raises(PoolSaturatedError):
+        asyncio.run(queue.run(b"audio", "call.wav"))
+    assert queue.stats()["rejected"] == 1
+
+
+def test_trim_stats_delta_only_reports_the_change():
+    before = {"voice": {"calls": 2, "original_seconds": 3.0, "removed_seconds": 1.0}}
+    after = {"voice": dict(before["voice"]),
+             "transcription": {"calls": 1, "original_seconds": 10.0, "removed_seconds": 2.0}}
+    assert _trim_stats_delta(before, after) == {"transcription": after["transcription"]}
+
+
+def _load_models(ready_dir, seconds):
+    # Stands in for _init_worker: the first worker is quick, the others take a while to load.
+    if os.listdir(ready_dir):
+        time.sleep(seconds)
+    open(os.path.join(ready_dir, str(os.getpid())), "w").close()
+
+
+def test_start_waits_for_every_worker(tmp_path):
+    queue = TranscriptionJobQueue(workers=3)
+    queue._executor = ProcessPoolExecutor(max_workers=3, initializer=_load_models, initargs=(str(tmp_path), 0.5))
+    try:
+        queue.start(timeout=30)
+        assert len(os.listdir(tmp_path)) == 3
+    finally:
+        queue.shutdown()
+
+
+def test_start_times_out(tmp_path):
+    queue = TranscriptionJobQueue(workers=2)
+    (tmp_path / "loading").touch()
+    queue._executor = ProcessPoolExecutor(max_workers=2, initializer=_load_models, initargs=(str(tmp_path), 5))
+    try:
+        with pytest.raises(TimeoutError):
+            queue.start(timeout=0.5)
+    finally:
+        queue.shutdown(wait=False)
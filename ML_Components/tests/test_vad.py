@@ -0,0 +1,102 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vad
+from vad import chunk_segments, energy_speech_frames, speech_segments, trim_silence, trim_stats, vad_signature
+
+RATE = 16000
+
+
+def _tone(seconds, amplitude, freq=220.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _silence(seconds, amplitude=1e-5, seed=0):
+    return (amplitude * np.random.default_rng(seed).standard_normal(int(seconds * RATE))).astype(np.float32)
+
+
+def _recording(speech_amplitude):
+    # 1 s silence, 1 s "speech", 1 s silence, 1 s "speech", 1 s silence
+    return np.concatenate([_silence(1), _tone(1, speech_amplitude), _silence(1, seed=1),
+                           _tone(1, speech_amplitude, 330.0), _silence(1, seed=2)])
+
+
+def test_speech_segments_cover_the_speech():
+    segments = speech_segments(_recording(0.3), RATE)
+    assert len(segments) == 2
+    (start1, end1), (start2, end2) = segments
+    assert start1 <= RATE <= end1 <= 2.2 * RATE
+    assert 2.8 * RATE <= start2 <= 3 * RATE <= 4 * RATE <= end2
+
+
+def test_detection_does_not_depend_on_the_input_gain():
+    loud = energy_speech_frames(_recording(0.3), RATE)
+    quiet = energy_speech_frames(_recording(0.3) * 1e-3, RATE)
+    np.testing.assert_array_equal(loud, quiet)
+
+
+def test_quiet_speech_with_a_loud_transient_is_kept():
+    audio = _recording(0.002)  # about -57 dBFS
+    audio[int(0.5 * RATE):int(0.53 * RATE)] = 0.9  # a click
+    trimmed, report = trim_silence(audio, RATE)
+    # Both seconds of speech survive, plus padding and the click.
+    assert 2.0 <= report["kept_seconds"] <= 3.0
+    assert report["removed_seconds"] == pytest.approx(report["original_seconds"] - report["kept_seconds"])
+    assert len(trimmed) == int(round(report["kept_seconds"] * RATE))
+
+
+def test_digital_silence_is_returned_unchanged():
+    audio = np.zeros(2 * RATE, dtype=np.float32)
+    trimmed, report = trim_silence(audio, RATE)
+    assert trimmed is audio and report["removed_seconds"] == 0.0
+
+
+def test_trim_stats_are_accumulated_per_stage():
+    before = trim_stats().get("test", {"calls": 0, "original_seconds": 0.0})
+    trim_silence(_recording(0.3), RATE, stage="test")
+    after = trim_stats()["test"]
+    assert after["calls"] == before["calls"] + 1
+    assert after["original_seconds"] == pytest.approx(before["original_seconds"] + 5.0)
+
+
+def test_chunk_segments_respect_the_maximum_length():
+    chunks = chunk_segments([(0, 10 * RATE), (11 * RATE, 12 * RATE), (13 * RATE, 80 * RATE)], RATE, max_chunk_s=30)
+    assert chunks[0] == (0, 12 * RATE)
+    assert all(end - start <= 30 * RATE for start, end in chunks)
+    assert chunks[-1][1] == 80 * RATE
+
+
+def test_signature_follows_the_configuration(monkeypatch):
+    signature = vad_signature()
+    monkeypatch.setattr(vad, "THRESHOLD_DB", vad.THRESHOLD_DB - 5)
+    assert vad_signature() != signature
+    monkeypatch.setattr(vad, "VAD_TRIM_ENABLED", False)
+    assert vad_signature() == "off"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        speech_segments(_recording(0.3), RATE, backend="nope")
+
+
+
+def _voiced(seconds, amplitude, f0=140.0):
+    # Harmonic tone with a syllable-rate envelope; WebRTC does not take a pure sine for speech.
+    t = np.arange(int(seconds * RATE)) / RATE
+    audio = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 20)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    return (amplitude * audio / np.abs(audio).max()).astype(np.float32)
+
+
+@pytest.mark.parametrize("amplitude", [0.3, 0.03])
+def test_webrtc_backend(monkeypatch, amplitude):
+    pytest.importorskip("webrtcvad")
+    monkeypatch.setattr(vad, "VAD_BACKEND", "webrtc")
+    audio = np.concatenate([_silence(1), _voiced(1, amplitude), _silence(1, seed=1),
+                            _voiced(1, amplitude, 180.0), _silence(1, seed=2)])
+    segments = speech_segments(audio, RATE)
+    assert len(segments) == 2
+    (start1, end1), (start2, end2) = segments
+    assert 0.8 * RATE <= start1 <= RATE and 2 * RATE <= end1 <= 2.4 * RATE
+    assert 2.8 * RATE <= start2 <= 3 * RATE and 4 * RATE <= end2 <= 4.4 * RATE
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("deepface")
+
+import video_embedding
+from video_embedding import VideoEmbedder, face_sharpness
+
+# Frames are stand-in labels here; the fakes below decide what DeepFace would find in each.
+SHARP = np.random.default_rng(0).random((32, 32, 3))
+BLURRY = np.full((32, 32, 3), 0.5)
+
+
+def fake_extract(frame, detector_backend=None, enforce_detection=True):
+    if frame == "no face":
+        # With enforce_detection=False DeepFace returns the whole frame with confidence 0.
+        return [{"face": SHARP, "confidence": 0}]
+    if frame == "blurry":
+        return [{"face": BLURRY, "confidence": 0.9}]
+    return [{"face": SHARP, "confidence": 0.9}]
+
+
+class FakeModel:
+    """Embeds every face as the same direction, so the running mean is stable from the start."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, faces, model_name=None):
+        self.batches.append(len(faces))
+        return np.tile([3.0, 4.0], (len(faces), 1))
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(video_embedding, "extract_face_crops", fake_extract)
+    monkeypatch.setattr(video_embedding, "embed_faces", model)
+    return model
+
+
+class Frames:
+    """Frame generator that records how far it was read and whether it was closed."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.read = 0
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        try:
+            for frame in self.frames:
+                self.read += 1
+                yield frame
+        finally:
+            self.closed.set()
+
+
+def test_stops_once_the_mean_has_converged(model):
+    frames = Frames(["face"] * 500)
+    embedder = VideoEmbedder(batch_size=2, min_faces=4, patience=2, queue_size=4)
+    embedding = embedder.embed(iter(frames))
+    # The first batch has nothing to compare with; two stable batches later the mean has converged.
+    assert embedder.converged and embedder.faces_used == 6 and model.batches == [2, 2, 2]
+    np.testing.assert_allclose(embedding, [3.0, 4.0])
+    # The decoder thread is stopped and the frame source closed, well before the end of the video.
+    assert frames.closed.is_set() and frames.read < 20
+    assert not any(thread.name == "video-decode" for thread in threading.enumerate())
+
+
+def test_faceless_and_blurry_frames_are_skipped(model):
+    embedder = VideoEmbedder(batch_size=8)
+    embedding = embedder.embed(iter(["no face", "blurry", "face", "no face", "face"]))
+    assert embedder.frames_seen == 5 and embedder.faces_used == 2
+    np.testing.assert_allclose(embedding, [3.0, 4.0])
+
+
+def test_weights_follow_confidence_and_sharpness(model, monkeypatch):
+    embedder = VideoEmbedder(sharpness_cap=200.0)
+    assert face_sharpness(BLURRY) == 0.0 and embedder.face_weight({"face": BLURRY, "confidence": 1.0}) is None
+    assert embedder.face_weight({"face": SHARP, "confidence": 0}) is None
+    assert embedder.face_weight({"face": SHARP, "confidence": 0.5}) == pytest.approx(0.5)  # sharpness capped
+
+    embedder.add_face(SHARP, 1.0)
+    embedder.add_face(SHARP, 3.0)
+    monkeypatch.setattr(video_embedding, "embed_faces", lambda faces, model_name=None: np.array([[1.0, 0.0], [0.0, 1.0]]))
+    np.testing.assert_allclose(embedder.result(), [0.25, 0.75])
+
+
+def test_a_failed_batch_is_skipped(model, monkeypatch):
+    def failing(faces, model_name=None):
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(video_embedding, "embed_faces", failing)
+    embedder = VideoEmbedder(batch_size=2)
+    assert embedder.embed(iter(["face"] * 4)) is None
+
+
+def test_decoder_errors_end_the_stream(model):
+    def broken_video():
+        yield "face"
+        raise IOError("corrupt frame")
+
+    embedder = VideoEmbedder(batch_size=4)
+    np.testing.assert_allclose(embedder.embed(broken_video()), [3.0, 4.0])
+    assert embedder.frames_seen == 1
+
+
+def test_empty_video_is_rejected(model):
+    with pytest.raises(ValueError):
+        VideoEmbedder().embed(iter([]))
@@ -0,0 +1,107 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("dlib")
+pytest.importorskip("deepface")
+
+import video_verification
+from video_verification import verify_video_stream
+
+VideoCapture = cv2.VideoCapture
+
+
+class CountingCapture:
+    def __init__(self, path):
+        self._cap = VideoCapture(path)
+        self.frames = 0
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def grab(self):
+        self.frames += 1
+        return self._cap.grab()
+
+    def read(self):
+        self.frames += 1
+        return self._cap.read()
+
+    def release(self):
+        self._cap.release()
+
+
+class UndecidedLiveness:
+    """Blinks are seen, but the decision is only settled once the frame budget is used up."""
+
+    min_blinks = 1
+
+    def __init__(self, frame_budget):
+        self.frame_budget = frame_budget
+        self.observed = 0
+        self.blink_counter = type("Blinks", (), {"blinks": 1})()
+        self.tracker = type("Tracker", (), {"locate": staticmethod(lambda gray: None)})()
+
+    def start(self, total_frames=None):
+        pass
+
+    def should_process(self, frame_index):
+        return frame_index % 4 == 0
+
+    def observe(self, frame):
+        self.observed += 1
+        return None, None
+
+    def decision(self, next_frame_index):
+        return True if next_frame_index >= self.frame_budget else None
+
+
+class ConvergedEmbedder:
+    converged = True
+    frames_seen = 0
+
+    def reset(self):
+        pass
+
+    def result(self):
+        return np.ones(4)
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(120):
+        writer.write(np.full((48, 64, 3), i % 255, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_stops_once_the_liveness_budget_is_used_up(video_path, monkeypatch):
+    captures = []
+    monkeypatch.setattr(video_verification.cv2, "VideoCapture",
+                        lambda path: captures.append(CountingCapture(path)) or captures[-1])
+    liveness = UndecidedLiveness(frame_budget=10)
+    live, embedding = verify_video_stream(video_path, liveness, ConvergedEmbedder())
+    assert live is True and embedding is not None
+    assert liveness.observed == 3  # frames 0, 4 and 8
+    assert captures[0].frames == 10  # not the remaining 110 frames
+
+
+def test_tracked_face_is_aligned_like_the_reference_photo():
+    skimage_data = pytest.importorskip("skimage.data")
+    import dlib
+    import face_recognition
+
+    portrait = np.ascontiguousarray(skimage_data.astronaut()[:, :, ::-1])
+    (x, y, w, h), = face_recognition.detect_faces(portrait)
+    face_obj = video_verification.align_tracked_face(portrait, dlib.rectangle(x, y, x + w - 1, y + h - 1))
+    assert face_obj["confidence"] > 0
+    np.testing.assert_array_equal(face_obj["face"], face_recognition.align_face(portrait, (x, y, w, h)))
+
+
+def test_tracked_box_outside_the_frame_is_skipped():
+    import dlib
+
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    assert video_verification.align_tracked_face(frame, dlib.rectangle(-200, -200, -100, -100)) is None
@@ -0,0 +1,98 @@
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+
+
+class TranscriptCache:
+    """
+    Transcripts keyed by a SHA-256 of the uploaded media plus the decoding options (model size,
+    profile settings), task and Whisper version, stored in SQLite.
+
+    Re-submitted media (client retries, replayed QA fixtures) is answered from the cache without
+    running ffmpeg or Whisper. The store survives restarts and is shared by every process that
+    opens the same file, including the transcription workers. When the stored text exceeds
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, language TEXT, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS transcripts_last_used ON transcripts (last_used)")
+
+    @staticmethod
+    def key(data: bytes, model: str, task: str, version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{model}\0{task}\0{version}\0".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached transcript text, or None on a miss."""
+        try:
+            with self._connection() as connection:
+                row = connection.execute("SELECT text FROM transcripts WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                connection.execute("UPDATE transcripts SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                                   (time.time(), key))
+                return row[0]
+        except sqlite3.Error as e:
+            logging.warning(f"Transcript cache lookup failed: {e}")
+            return None
+
+    def put(self, key: str, text: str, language: str = None):
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, text, language, size, created_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, text, language, size, now, now),
+                )
+                self._evict(connection)
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to store transcript in cache: {e}")
+
+    def stats(self) -> dict:
+        try:
+            with self._connection() as connection:
+                entries, total_bytes, hits = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM transcripts"
+                ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Transcript cache stats failed: {e}")
+            entries = total_bytes = hits = None
+        return {"entries": entries, "bytes": total_bytes, "max_bytes": self.max_bytes, "hits": hits}
+
+    def _evict(self, connection):
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        excess = total_bytes - self.max_bytes
+        evicted = 0
+        for key, size in connection.execute("SELECT key, size FROM transcripts ORDER BY last_used").fetchall():
+            if excess <= 0:
+                break
+            connection.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            excess -= size
+            evicted += 1
+        logging.debug(f"Evicted {evicted} transcripts from the cache.")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads; each thread opens its own.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
@@ -1,7 +1,12 @@
 import os
+import json
 import logging
+import itertools
 import tempfile
+import threading
+import subprocess
 import ctypes.util
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,9 +23,6 @@ os.environ["FFMPEG_BINARY"] = ffmpeg_path
 ffmpeg_dir = os.getenv("FFMPEG_DIR", os.path.dirname(ffmpeg_path))
 os.environ["PATH"] = f"{ffmpeg_dir};" + os.environ.get("PATH", "")
 
-from pydub import AudioSegment
-AudioSegment.converter = os.environ["FFMPEG_BINARY"]
-
 # --- Monkey Patch for Windows ---
 if os.name == "nt":
     import ctypes
@@ -33,51 +35,324 @@ if os.name == "nt":
     ctypes.util.find_library = my_find_library
 # --- End Patch ---
 
+import numpy as np
+import torch
 import whisper
-
-# Explicitly set the ffmpeg path on Windows (redundant but for safety)
-if os.name == "nt":
-    AudioSegment.converter = os.environ["FFMPEG_BINARY"]
+from vad import speech_segments, chunk_segments, trim_silence, vad_signature, VAD_TRIM_ENABLED
+from transcript_cache import TranscriptCache
+from embedding_cache import package_version
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Whisper expects 16 kHz mono audio.
+SAMPLE_RATE = 16000
+
+
+def _tensors(value):
+    # State dict values are tensors, except for the packed params of quantized layers, which are
+    # (weight, bias) tuples, and their dtype entries.
+    if isinstance(value, torch.Tensor):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _tensors(item)
+
+
+def _model_nbytes(model) -> int:
+    """
+    Approximates the memory held by a loaded Whisper model from the tensors of its state dict,
+    which include the packed int8 weights of quantized layers, and its non-persistent buffers.
+    Tensors sharing storage are counted once.
+    """
+    seen = set()
+    nbytes = 0
+    for tensor in itertools.chain(_tensors(list(model.state_dict().values())), model.buffers()):
+        if tensor.data_ptr() in seen:
+            continue
+        seen.add(tensor.data_ptr())
+        nbytes += tensor.numel() * tensor.element_size()
+    return nbytes
+
+
+def _quantize(model, quantization: str):
+    """
+    Dynamic int8 quantization of the linear layers, for CPU inference.
+    """
+    if quantization != "int8":
+        raise ValueError(f"Unsupported Whisper quantization: {quantization}")
+    if model.device.type != "cpu":
+        logging.warning("int8 quantization only applies to CPU models; keeping the full-precision weights.")
+        return model
+    # Whisper's Linear subclass only adds a dtype cast, which fp32 inference does not need, and
+    # quantize_dynamic only swaps modules whose type is exactly nn.Linear.
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide cache of loaded Whisper models.
+
+    Each model size is loaded at most once per quantization and kept warm for the life of the
+    process. When a memory budget is set, the least recently used models are evicted until the
+    loaded models fit in it again; the model that was just requested is never evicted.
+    """
+
+    def __init__(self, memory_budget_mb=None, device=None):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self.device = device
+        self._models = OrderedDict()  # model key -> (model, nbytes), least recently used first
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    @staticmethod
+    def model_key(model_size: str, quantization: str = None) -> str:
+        return f"{model_size}:{quantization}" if quantization else model_size
+
+    def get(self, model_size: str, quantization: str = None):
+        """
+        Returns the model for `model_size`, loading it on first use. With quantization="int8",
+        the linear layers are dynamically quantized to int8 (CPU only).
+        """
+        key = self.model_key(model_size, quantization)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; the others wait for it and reuse the result.
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    return entry[0]
+
+            logging.info(f"Loading Whisper model '{key}'...")
+            model = whisper.load_model(model_size, device=self.device)
+            if quantization:
+                model = _quantize(model, quantization)
+            nbytes = _model_nbytes(model)
+            logging.info(f"Whisper model '{key}' loaded ({nbytes / 1024 / 1024:.1f} MB).")
+
+            with self._lock:
+                self._models[key] = (model, nbytes)
+                self._enforce_budget(keep=key)
+            return model
+
+    def preload(self, model_sizes):
+        """
+        Loads the given model sizes ahead of the first request.
+        """
+        for model_size in model_sizes:
+            self.get(model_size)
+
+    def evict(self, model_size: str, quantization: str = None) -> bool:
+        """
+        Drops a loaded model. Returns False if it was not loaded.
+        """
+        with self._lock:
+            return self._models.pop(self.model_key(model_size, quantization), None) is not None
+
+    def loaded_sizes(self):
+        with self._lock:
+            return list(self._models.keys())
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._models.values())
+
+    def _enforce_budget(self, keep: str):
+        # Caller must hold self._lock.
+        if self.memory_budget_bytes is None:
+            return
+        total = sum(nbytes for _, nbytes in self._models.values())
+        for key in list(self._models.keys()):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            _, nbytes = self._models.pop(key)
+            total -= nbytes
+            logging.info(f"Evicted Whisper model '{key}' to stay within the memory budget.")
+        if total > self.memory_budget_bytes:
+            logging.warning(f"Whisper model '{keep}' alone exceeds the memory budget "
+                            f"({total / 1024 / 1024:.1f} MB loaded).")
+
+
+# Shared registry used by every transcription in this process.
+# WHISPER_MEMORY_BUDGET_MB caps the memory of loaded models (unset or 0 means unlimited).
+whisper_registry = WhisperModelRegistry(
+    memory_budget_mb=float(os.getenv("WHISPER_MEMORY_BUDGET_MB", "0")) or None,
+    device=os.getenv("WHISPER_DEVICE") or None,
+)
+
+
+# Options every decoding profile starts from: Whisper's own transcribe defaults on "base".
+# fp16=None means fp16 on CUDA and fp32 on CPU.
+DEFAULT_DECODING_OPTIONS = {
+    "model_size": "base",
+    "quantization": None,
+    "fp16": None,
+    "beam_size": None,
+    "best_of": None,
+    "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+    "language": None,
+    "condition_on_previous_text": True,
+}
+
+DECODING_PROFILES = {
+    # What process_file has always run.
+    "default": {},
+    # Greedy decoding without temperature fallback on int8 weights: highest throughput on CPU.
+    "fast": {"quantization": "int8", "temperature": 0.0, "condition_on_previous_text": False},
+    # Beam search on a larger model.
+    "accurate": {"model_size": "small", "beam_size": 5, "best_of": 5},
+}
+
+# Profile used when a request does not name one.
+WHISPER_DECODING_PROFILE = os.getenv("WHISPER_DECODING_PROFILE", "default")
+
+
+def language_code(language: str):
+    """
+    Whisper's code for a language given as a code ("hi") or an English name ("Hindi"), or None if
+    Whisper does not know the language.
+    """
+    language = language.strip().lower()
+    if language in whisper.tokenizer.LANGUAGES:
+        return language
+    return whisper.tokenizer.TO_LANGUAGE_CODE.get(language)
+
+
+def resolve_decoding_options(profile: str = None, **overrides) -> dict:
+    """
+    Decoding options of a profile (WHISPER_DECODING_PROFILE by default), with any overrides
+    that are not None applied on top. A language override is normalised to Whisper's code.
+    Raises ValueError for an unknown profile or language.
+    """
+    profile = profile or WHISPER_DECODING_PROFILE
+    if profile not in DECODING_PROFILES:
+        raise ValueError(f"Unknown decoding profile '{profile}'. Choose one of: {', '.join(DECODING_PROFILES)}")
+    options = {**DEFAULT_DECODING_OPTIONS, **DECODING_PROFILES[profile]}
+    options.update({name: value for name, value in overrides.items() if value is not None})
+    if options["language"] is not None:
+        code = language_code(options["language"])
+        if code is None:
+            raise ValueError(f"Unsupported language '{options['language']}'.")
+        options["language"] = code
+    return options
+
+
+def decoding_signature(options: dict) -> str:
+    """
+    Stable text form of decoding options and the VAD settings (which change the audio Whisper
+    sees), used in cache keys.
+    """
+    return json.dumps({**options, "vad": vad_signature()}, sort_keys=True)
+
+
+def transcribe_audio(audio: np.ndarray, options: dict, **transcribe_kwargs) -> dict:
+    """
+    Transcribes 16 kHz PCM with the given decoding options (see resolve_decoding_options).
+    The task is always "translate" so that any Hindi, Marathi, or other non-English input is
+    translated to English. Returns Whisper's result dict.
+    """
+    model = whisper_registry.get(options["model_size"], options["quantization"])
+    fp16 = options["fp16"] if options["fp16"] is not None else model.device.type == "cuda"
+    kwargs = {
+        "task": "translate",
+        "temperature": options["temperature"],
+        "condition_on_previous_text": options["condition_on_previous_text"],
+        "fp16": fp16,
+        "language": options["language"],
+        "beam_size": options["beam_size"],
+        "best_of": options["best_of"],
+    }
+    kwargs.update(transcribe_kwargs)
+    return model.transcribe(audio, **kwargs)
+
 
-def process_file(file_data: bytes, file_ext: str, model_size="base"):
+def preload_whisper_models(model_sizes=None):
+    """
+    Warms the registry at startup. Defaults to the model of the deployment's decoding profile
+    (WHISPER_DECODING_PROFILE), plus any comma-separated sizes in WHISPER_PRELOAD_MODELS.
+    """
+    if model_sizes is None:
+        options = resolve_decoding_options()
+        whisper_registry.get(options["model_size"], options["quantization"])
+        model_sizes = [size.strip() for size in os.getenv("WHISPER_PRELOAD_MODELS", "").split(",") if size.strip()]
+    whisper_registry.preload(model_sizes)
+
+
+# Transcripts of media seen before are served from TRANSCRIPT_CACHE_PATH (an SQLite file shared
+# by all workers) up to TRANSCRIPT_CACHE_MAX_MB of text. Set TRANSCRIPT_CACHE_PATH= to disable.
+_transcript_cache_path = os.getenv("TRANSCRIPT_CACHE_PATH", "transcript_cache.sqlite3")
+transcript_cache = TranscriptCache(
+    _transcript_cache_path,
+    max_bytes=int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+) if _transcript_cache_path else None
+WHISPER_VERSION = package_version("openai-whisper")
+
+
+def transcript_cache_key(file_data: bytes, options: dict) -> str:
+    return TranscriptCache.key(file_data, decoding_signature(options), "translate", WHISPER_VERSION)
+
+
+def cached_transcript(file_data: bytes, model_size=None, profile=None, language=None):
+    """
+    The transcript process_file would return from the cache for these bytes and options, or None
+    on a miss. Needs no model, so the API can answer re-submitted media without a worker.
+    """
+    if transcript_cache is None:
+        return None
+    options = resolve_decoding_options(profile, model_size=model_size, language=language)
+    return transcript_cache.get(transcript_cache_key(file_data, options))
+
+
+def process_file(file_data: bytes, file_ext: str, model_size=None, profile=None, language=None):
     """
     Processes an uploaded audio/video file from raw bytes, converts it if necessary, and transcribes it.
     The transcription task is set to "translate" so that any Hindi, Marathi, or other non-English input
     is automatically translated to English.
+    `profile` selects the decoding profile (see DECODING_PROFILES); `model_size` and the `language`
+    hint override it.
     """
     try:
         logging.debug(f"Starting file processing. File extension: {file_ext} | Data size: {len(file_data)} bytes")
-        # Create a temporary file in the system temp directory
-        temp_file_path = os.path.join(tempfile.gettempdir(), "temp_file" + file_ext)
-        with open(temp_file_path, "wb") as temp_file:
-            temp_file.write(file_data)
-
-        logging.info(f"Temporary file saved at: {temp_file_path}")
-        # Convert and extract audio if needed
-        temp_audio_path = convert_to_wav(temp_file_path)
-        if not temp_audio_path:
+        options = resolve_decoding_options(profile, model_size=model_size, language=language)
+        cache_key = None
+        if transcript_cache is not None:
+            cache_key = transcript_cache_key(file_data, options)
+            cached = transcript_cache.get(cache_key)
+            if cached is not None:
+                logging.info("Transcript served from cache.")
+                return cached
+
+        audio = decode_audio(file_data, file_ext)
+        if audio is None or audio.size == 0:
             logging.error("Failed to convert/extract audio.")
             return None
-
-        logging.info("Loading Whisper model...")
-        model = whisper.load_model(model_size)
-        logging.info("Whisper model loaded successfully.")
+        if VAD_TRIM_ENABLED:
+            # Leading/trailing silence and hold noise only cost inference time.
+            audio, trim_report = trim_silence(audio, SAMPLE_RATE, stage="transcription")
+            logging.info(f"Trimmed {trim_report['removed_seconds']:.1f}s of non-speech "
+                         f"from {trim_report['original_seconds']:.1f}s of audio.")
 
         logging.info("Starting transcription with translation task (output will be in English)...")
         # Use the "translate" task so that non-English speech is translated to English.
-        result = model.transcribe(temp_audio_path, task="translate")
+        result = transcribe_audio(audio, options)
         detected_language = result.get("language", "unknown")
         logging.info(f"Transcription completed. Detected language: {detected_language}")
         logging.debug(f"Detected language: {detected_language}")
 
-        # Cleanup temporary files
-        os.remove(temp_file_path)
-        os.remove(temp_audio_path)
-
         logging.debug(f"Transcribed text (first 100 chars): {result.get('text', '')[:100]}...")
+        if cache_key is not None:
+            transcript_cache.put(cache_key, result["text"], detected_language)
         return result["text"]
 
     except Exception as e:
@@ -85,20 +360,74 @@ def process_file(file_data: bytes, file_ext: str, model_size="base"):
         return None
 
 
-def convert_to_wav(input_path):
+def transcribe_chunks(file_data: bytes, file_ext: str, model_size=None, max_chunk_s=30.0, profile=None, language=None):
     """
-    Converts input audio/video file to WAV (16kHz mono) for Whisper processing.
-    Returns the path to the converted file.
+    Streaming counterpart of process_file. The decoded audio is split at pauses into chunks of at
+    most `max_chunk_s` seconds (see vad.chunk_segments), and each chunk is transcribed and
+    yielded as soon as it is ready: {"index", "start", "end", "text", "language"}, with times in
+    seconds. Silence between speech segments is never sent to Whisper. Unless a `language` hint
+    is given, the language detected on the first chunk is reused for the following ones.
+    Closing the generator stops the transcription after the current chunk.
     """
-    try:
-        temp_wav_path = input_path + ".wav"
-        logging.info("Converting audio to 16 kHz mono...")
-        audio = AudioSegment.from_file(input_path)
-        audio = audio.set_frame_rate(16000).set_channels(1)
-        audio.export(temp_wav_path, format="wav")
-        logging.info(f"Conversion successful. WAV file at: {temp_wav_path}")
-        return temp_wav_path
+    logging.debug(f"Starting chunked transcription. File extension: {file_ext} | Data size: {len(file_data)} bytes")
+    audio = decode_audio(file_data, file_ext)
+    if audio is None or audio.size == 0:
+        logging.error("Failed to convert/extract audio.")
+        return
 
-    except Exception as e:
-        logging.error(f"Error converting audio: {e}", exc_info=True)
-        return None
+    options = resolve_decoding_options(profile, model_size=model_size, language=language)
+    chunks = chunk_segments(speech_segments(audio, SAMPLE_RATE), SAMPLE_RATE, max_chunk_s=max_chunk_s)
+    logging.info(f"Transcribing {len(chunks)} chunks of speech...")
+    for index, (start, end) in enumerate(chunks):
+        result = transcribe_audio(audio[start:end], options)
+        options["language"] = options["language"] or result.get("language")
+        yield {
+            "index": index,
+            "start": start / SAMPLE_RATE,
+            "end": end / SAMPLE_RATE,
+            "text": result.get("text", "").strip(),
+            "language": result.get("language", "unknown"),
+        }
+
+
+def _ffmpeg_decode_command(input_target: str, sample_rate: int):
+    return [
+        ffmpeg_path, "-nostdin", "-loglevel", "error", "-threads", "0",
+        "-i", input_target,
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "-acodec", "pcm_f32le",
+        "pipe:1",
+    ]
+
+
+def decode_audio(file_data: bytes, file_ext: str = "", sample_rate: int = SAMPLE_RATE):
+    """
+    Decodes uploaded audio/video bytes into 16 kHz mono float32 PCM for Whisper.
+    The bytes are piped through ffmpeg and the PCM is read from its stdout straight into a NumPy
+    array, so nothing touches the disk. Containers that ffmpeg cannot read from a pipe (e.g. MP4/MOV
+    with the index at the end of the file) fall back to a uniquely named scratch file.
+    Returns None if the media cannot be decoded.
+    """
+    logging.info(f"Decoding audio to {sample_rate // 1000} kHz mono...")
+    process = subprocess.run(
+        _ffmpeg_decode_command("pipe:0", sample_rate), input=file_data, capture_output=True
+    )
+    if process.returncode == 0 and process.stdout:
+        return np.frombuffer(process.stdout, dtype=np.float32)
+
+    logging.warning(f"Streaming decode failed, retrying from a scratch file: "
+                    f"{process.stderr.decode(errors='ignore').strip()}")
+    return _decode_audio_from_scratch_file(file_data, file_ext, sample_rate)
+
+
+def _decode_audio_from_scratch_file(file_data: bytes, file_ext: str, sample_rate: int):
+    fd, scratch_path = tempfile.mkstemp(prefix="ticket_media_", suffix=file_ext)
+    try:
+        with os.fdopen(fd, "wb") as scratch_file:
+            scratch_file.write(file_data)
+        process = subprocess.run(_ffmpeg_decode_command(scratch_path, sample_rate), capture_output=True)
+        if process.returncode != 0:
+            logging.error(f"Error converting audio: {process.stderr.decode(errors='ignore').strip()}")
+            return None
+        return np.frombuffer(process.stdout, dtype=np.float32)
+    finally:
+        os.remove(scratch_path)
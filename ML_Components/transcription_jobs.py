@@ -0,0 +1,277 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from executors import PoolSaturatedError, wait_for_workers
+from vad import trim_stats, add_trim_stats
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _init_worker(torch_threads: int):
+    """Runs once in every worker process: caps torch's threads and loads the Whisper model(s)."""
+    import torch
+    torch.set_num_threads(torch_threads)
+    from transcription import preload_whisper_models
+    preload_whisper_models()
+
+
+# Same fallback as process_media_query when the transcription itself fails.
+FALLBACK_RESULT = {"transcribed_text": "", "department": "Loan Services Department"}
+
+
+def _run_job(file_data: bytes, filename: str, profile: str = None, language: str = None):
+    """
+    Runs in a worker process. Returns the query result and the VAD trim totals of this job, which
+    the parent adds to its own so /metrics/vad covers the transcriptions done by the workers.
+    """
+    from final_query_categorisation import process_media_query
+    before = trim_stats()
+    result = process_media_query(file_data, filename, profile=profile, language=language)
+    return result, _trim_stats_delta(before, trim_stats())
+
+
+def _trim_stats_delta(before: dict, after: dict) -> dict:
+    # A worker runs one job at a time, so the change in its totals is exactly this job's trimming.
+    empty = {"calls": 0, "original_seconds": 0.0, "removed_seconds": 0.0}
+    return {stage: {key: value - before.get(stage, empty)[key] for key, value in totals.items()}
+            for stage, totals in after.items() if totals != before.get(stage)}
+
+
+class TranscriptionJob:
+    def __init__(self, job_id: str, filename: str, future):
+        self.id = job_id
+        self.filename = filename
+        self.future = future
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.executor = None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            # A job counts as running once it has been handed to a worker process.
+            return RUNNING if self.future.running() else QUEUED
+        return FAILED if self.future.cancelled() or self.future.exception() is not None else DONE
+
+    def result(self):
+        """The /query/file result of a finished job (see _run_job)."""
+        result, _ = self.future.result()
+        return result
+
+    def to_dict(self) -> dict:
+        status = self.status
+        job = {
+            "job_id": self.id,
+            "status": status,
+            "filename": self.filename,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+        }
+        if status == DONE:
+            job["result"] = self.result()
+        elif status == FAILED:
+            job["error"] = "Job was cancelled." if self.future.cancelled() else str(self.future.exception())
+        return job
+
+
+class TranscriptionJobQueue:
+    """
+    Runs /query/file transcriptions as jobs in a pool of worker processes.
+
+    Every worker loads its own Whisper model at start-up and limits torch to `torch_threads`
+    threads, so `workers` transcriptions run in parallel without oversubscribing the cores. At
+    most `max_pending` jobs may be queued or running; further submissions raise
+    PoolSaturatedError. Finished jobs are kept for `result_ttl` seconds for polling.
+    """
+
+    def __init__(self, workers: int = 2, torch_threads: int = None, max_pending: int = 16, result_ttl: float = 600):
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cached = 0
+        self._turnaround_seconds = 0.0
+
+    def start(self, timeout: float = 600):
+        """
+        Starts the worker processes and waits until every one of them has loaded its models.
+        Raises TimeoutError if that takes longer than `timeout` seconds.
+        """
+        pids = wait_for_workers(self._get_executor(), self.workers, timeout)
+        logging.info(f"Transcription workers ready: {len(pids)} processes with {self.torch_threads} torch threads each.")
+
+    def submit(self, file_data: bytes, filename: str, profile: str = None, language: str = None) -> TranscriptionJob:
+        self._purge_expired()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PoolSaturatedError(
+                    f"Too many transcription jobs in progress ({self._pending}); retry later.")
+            self._pending += 1
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(_run_job, file_data, filename, profile, language)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool and retry once.
+                logging.error("Transcription worker pool is broken; restarting it.")
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(_run_job, file_data, filename, profile, language)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        job = TranscriptionJob(uuid.uuid4().hex, filename, future)
+        job.executor = executor  # to replace the pool if this job finds it broken
+        with self._lock:
+            self._jobs[job.id] = job
+            self._submitted += 1
+        future.add_done_callback(lambda _: self._finished(job))
+        return job
+
+    def add_cached(self, filename: str, result: dict) -> TranscriptionJob:
+        """
+        Records a job whose result was answered from the transcript cache, so it can be polled like
+        any other job. It takes no job slot and is not counted as submitted.
+        """
+        self._purge_expired()
+        future = Future()
+        future.set_result((result, {}))
+        job = TranscriptionJob(uuid.uuid4().hex, filename, future)
+        job.finished_at = job.submitted_at
+        with self._lock:
+            self._jobs[job.id] = job
+            self._cached += 1
+        return job
+
+    def get(self, job_id: str):
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job: TranscriptionJob, timeout: float) -> TranscriptionJob:
+        """Waits up to `timeout` seconds for the job to finish (long polling)."""
+        if timeout > 0 and not job.future.done():
+            try:
+                # shield: a timeout must not cancel the job itself.
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                pass  # reported through the job status
+        return job
+
+    async def run(self, file_data: bytes, filename: str, profile: str = None, language: str = None):
+        """
+        Submits a job and awaits its result. If the job fails in the worker (including a worker
+        process dying), the default-department fallback is returned, as before the worker pool.
+        Raises PoolSaturatedError when too many jobs are pending.
+        """
+        job = self.submit(file_data, filename, profile, language)
+        try:
+            await asyncio.wrap_future(job.future)
+        except BrokenProcessPool as e:
+            logging.error(f"Transcription worker died while running job {job.id}: {e}")
+            self._reset_executor(job.executor)
+            return dict(FALLBACK_RESULT)
+        except Exception as e:
+            logging.error(f"Transcription job {job.id} failed: {e}", exc_info=True)
+            return dict(FALLBACK_RESULT)
+        return job.result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            finished = self._completed + self._failed
+            return {
+                "workers": self.workers,
+                "torch_threads": self.torch_threads,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "queue_depth": queued,
+                "running": self._pending - queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "cached": self._cached,
+                "mean_turnaround_seconds": self._turnaround_seconds / finished if finished else None,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn": forking a process that already runs torch threads can deadlock the child.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,),
+                )
+            return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        """Drops a broken executor; the next submission starts a fresh one."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # already replaced by another request
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, job: TranscriptionJob):
+        job.finished_at = time.time()
+        with self._lock:
+            self._pending -= 1
+            failed = job.future.cancelled() or job.future.exception() is not None
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            self._turnaround_seconds += job.finished_at - job.submitted_at
+        if not failed:
+            add_trim_stats(job.future.result()[1])
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+# TRANSCRIPTION_WORKERS processes, each limited to TRANSCRIPTION_TORCH_THREADS torch threads
+# (default: the cores divided between the workers). TRANSCRIPTION_MAX_PENDING bounds the jobs
+# queued or running, and finished jobs can be polled for TRANSCRIPTION_RESULT_TTL seconds.
+transcription_jobs = TranscriptionJobQueue(
+    workers=int(os.getenv("TRANSCRIPTION_WORKERS", "2")),
+    torch_threads=int(os.getenv("TRANSCRIPTION_TORCH_THREADS", "0")) or None,
+    max_pending=int(os.getenv("TRANSCRIPTION_MAX_PENDING", "16")),
+    result_ttl=float(os.getenv("TRANSCRIPTION_RESULT_TTL", "600")),
+)
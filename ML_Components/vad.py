@@ -0,0 +1,208 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:  # optional; the energy detector is used instead
+    webrtcvad = None
+
+# "energy" (default) or "webrtc". WebRTC needs the webrtcvad package and falls back to energy without it.
+VAD_BACKEND = os.getenv("VAD_BACKEND", "energy")
+# Set VAD_TRIM=0 to feed Whisper and the voice encoder the untrimmed audio.
+VAD_TRIM_ENABLED = os.getenv("VAD_TRIM", "1") != "0"
+
+WEBRTC_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+
+# Detector settings. Levels are in dB relative to the recording's speech level (see
+# energy_speech_frames) except SILENCE_DB, which is in dBFS.
+THRESHOLD_DB = -25.0
+MARGIN_DB = 12.0
+CEILING_DB = -10.0
+SILENCE_DB = -80.0
+REFERENCE_PERCENTILE = 95
+WEBRTC_AGGRESSIVENESS = 2
+FRAME_MS = 30
+MIN_SILENCE_MS = 300
+PADDING_MS = 150
+
+
+def vad_signature() -> str:
+    """
+    Stable text form of the trimming configuration. It is part of the embedding and transcript
+    cache keys, so results computed with other VAD settings are not served from the cache.
+    """
+    if not VAD_TRIM_ENABLED:
+        return "off"
+    backend = "energy" if VAD_BACKEND == "webrtc" and webrtcvad is None else VAD_BACKEND
+    return json.dumps({
+        "backend": backend, "threshold_db": THRESHOLD_DB, "margin_db": MARGIN_DB,
+        "ceiling_db": CEILING_DB, "silence_db": SILENCE_DB, "reference_percentile": REFERENCE_PERCENTILE,
+        "webrtc_aggressiveness": WEBRTC_AGGRESSIVENESS, "frame_ms": FRAME_MS,
+        "min_silence_ms": MIN_SILENCE_MS, "padding_ms": PADDING_MS,
+    }, sort_keys=True)
+
+
+def _frame_view(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    n_frames = len(audio) // frame_length
+    return audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+
+
+def energy_speech_frames(audio, sample_rate, frame_ms=FRAME_MS, threshold_db=THRESHOLD_DB, margin_db=MARGIN_DB,
+                         ceiling_db=CEILING_DB, silence_db=SILENCE_DB,
+                         reference_percentile=REFERENCE_PERCENTILE) -> np.ndarray:
+    """
+    Marks frames as speech by their RMS level relative to the recording's speech level, taken as
+    the `reference_percentile` of the frame levels, so the decision does not depend on the input
+    gain and a few loud transients (clicks, a door) do not raise the bar for the speech around them.
+    A frame is speech when it is above both `threshold_db` and the noise floor (10th percentile of
+    the frame levels) plus `margin_db`. The adaptive part is capped at `ceiling_db`, so a recording
+    with hardly any pauses is not mistaken for noise. Frames below `silence_db` dBFS are never speech.
+    Returns one bool per frame.
+    """
+    frames = _frame_view(audio, int(sample_rate * frame_ms / 1000))
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    level_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    level_db -= np.percentile(level_db, reference_percentile)
+    noise_floor = np.percentile(level_db, 10)
+    return (level_db > max(threshold_db, min(noise_floor + margin_db, ceiling_db))) & (rms > 10 ** (silence_db / 20))
+
+
+def webrtc_speech_frames(audio, sample_rate, frame_ms=FRAME_MS, aggressiveness=WEBRTC_AGGRESSIVENESS) -> np.ndarray:
+    """
+    Frame-level speech decisions from the WebRTC VAD. `frame_ms` must be 10, 20 or 30 and the
+    sample rate one of 8, 16, 32 or 48 kHz. The audio is first scaled so its speech level (see
+    energy_speech_frames) is -20 dBFS, as the WebRTC decisions depend on the input level.
+    """
+    vad = webrtcvad.Vad(aggressiveness)
+    frame_length = int(sample_rate * frame_ms / 1000)
+    frames = _frame_view(audio, frame_length)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    gain = 0.1 / max(float(np.percentile(rms, REFERENCE_PERCENTILE)), 10 ** (SILENCE_DB / 20))
+    pcm = (np.clip(frames * gain, -1.0, 1.0) * 32767).astype(np.int16)
+    return np.fromiter((vad.is_speech(frame.tobytes(), sample_rate) for frame in pcm),
+                       dtype=bool, count=len(frames))
+
+
+def speech_frames(audio, sample_rate, frame_ms=FRAME_MS, backend=None) -> np.ndarray:
+    backend = backend or VAD_BACKEND
+    if backend == "webrtc":
+        if webrtcvad is not None and sample_rate in WEBRTC_SAMPLE_RATES and frame_ms in (10, 20, 30):
+            return webrtc_speech_frames(audio, sample_rate, frame_ms)
+        logging.warning("WebRTC VAD unavailable for this input; using the energy detector.")
+    elif backend != "energy":
+        raise ValueError(f"Unknown VAD backend: {backend}")
+    return energy_speech_frames(audio, sample_rate, frame_ms)
+
+
+def speech_segments(audio, sample_rate, frame_ms=FRAME_MS, min_silence_ms=MIN_SILENCE_MS, padding_ms=PADDING_MS,
+                    backend=None):
+    """
+    Speech regions of a mono float PCM buffer as (start, end) sample indexes.
+    Pauses shorter than `min_silence_ms` are kept inside a segment, and every segment is padded
+    by `padding_ms` on both sides so word onsets and endings are not clipped.
+    """
+    is_speech = speech_frames(audio, sample_rate, frame_ms, backend)
+    frame_length = int(sample_rate * frame_ms / 1000)
+    max_gap = max(1, min_silence_ms // frame_ms)
+    padding = int(sample_rate * padding_ms / 1000)
+
+    # Runs of speech frames, with short gaps merged.
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0]))))
+    runs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if runs and start - runs[-1][1] < max_gap:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+
+    segments = []
+    for start, end in runs:
+        start = max(0, start * frame_length - padding)
+        end = min(len(audio), end * frame_length + padding)
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def chunk_segments(segments, sample_rate, max_chunk_s=30.0):
+    """
+    Groups consecutive speech segments into chunks of at most `max_chunk_s` seconds, so chunk
+    boundaries fall in pauses. A single segment longer than that is cut into equal pieces.
+    Returns (start, end) sample indexes.
+    """
+    max_length = int(max_chunk_s * sample_rate)
+    chunks = []
+    for start, end in segments:
+        if end - start > max_length:
+            pieces = -(-(end - start) // max_length)
+            bounds = np.linspace(start, end, pieces + 1).astype(int)
+            chunks.extend(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        elif chunks and end - chunks[-1][0] <= max_length:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+
+_trim_totals = {}
+_trim_lock = threading.Lock()
+
+
+def trim_silence(audio, sample_rate, stage=None, backend=None, **kwargs):
+    """
+    Cuts the non-speech parts out of a mono float PCM buffer (see speech_segments for the
+    options) and returns (trimmed audio, report). The report gives the original, kept and
+    removed durations in seconds and the removed fraction. If no speech is found at all, the
+    audio is returned unchanged rather than empty.
+    When `stage` is given, the durations are added to the totals returned by trim_stats.
+    """
+    segments = speech_segments(audio, sample_rate, backend=backend, **kwargs)
+    if not segments:
+        trimmed = audio
+    elif len(segments) == 1:
+        start, end = segments[0]
+        trimmed = audio[start:end]
+    else:
+        trimmed = np.concatenate([audio[start:end] for start, end in segments])
+
+    original_seconds = len(audio) / sample_rate
+    kept_seconds = len(trimmed) / sample_rate
+    report = {
+        "original_seconds": original_seconds,
+        "kept_seconds": kept_seconds,
+        "removed_seconds": original_seconds - kept_seconds,
+        "removed_ratio": (original_seconds - kept_seconds) / original_seconds if original_seconds else 0.0,
+    }
+    if stage is not None:
+        with _trim_lock:
+            totals = _trim_totals.setdefault(stage, {"calls": 0, "original_seconds": 0.0, "removed_seconds": 0.0})
+            totals["calls"] += 1
+            totals["original_seconds"] += original_seconds
+            totals["removed_seconds"] += report["removed_seconds"]
+        logging.debug(f"VAD ({stage}): removed {report['removed_seconds']:.1f}s of {original_seconds:.1f}s "
+                      f"({report['removed_ratio']:.0%}).")
+    return trimmed, report
+
+
+def trim_stats() -> dict:
+    """Audio removed so far by trim_silence, per stage."""
+    with _trim_lock:
+        return {stage: dict(totals) for stage, totals in _trim_totals.items()}
+
+
+def add_trim_stats(stats: dict):
+    """Adds totals in the trim_stats format, e.g. those of trimming done in a worker process."""
+    with _trim_lock:
+        for stage, totals in stats.items():
+            merged = _trim_totals.setdefault(stage, {"calls": 0, "original_seconds": 0.0, "removed_seconds": 0.0})
+            for key, value in totals.items():
+                merged[key] += value
@@ -0,0 +1,173 @@
+import queue
+import logging
+import threading
+import cv2
+import numpy as np
+
+from deepface_batch import extract_face_crops, embed_faces
+
+_END = object()
+
+
+def face_sharpness(face) -> float:
+    """
+    Variance of the Laplacian of a face crop (float RGB in [0, 1], as DeepFace extracts it).
+    Low values mean a blurry face.
+    """
+    gray = cv2.cvtColor((np.clip(face, 0, 1) * 255).astype(np.uint8), cv2.COLOR_RGB2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def _decode(frames, frame_queue, stop):
+    try:
+        for frame in frames:
+            while not stop.is_set():
+                try:
+                    frame_queue.put(frame, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                break
+    except Exception as e:
+        logging.error(f"Error decoding video frames: {e}", exc_info=True)
+    finally:
+        if hasattr(frames, "close"):
+            frames.close()
+        frame_queue.put(_END)
+
+
+class VideoEmbedder:
+    """
+    Quality-weighted video embedding with decoding and inference in separate stages.
+
+    A background thread decodes frames into a bounded queue while the calling thread detects the
+    face in each frame and embeds the crops in batches of `batch_size` with one forward pass.
+    Frames without a detected face or with a face sharpness below `min_sharpness` are skipped; the
+    others are weighted by detector confidence times sharpness (capped at `sharpness_cap`). The
+    run stops early once the normalised running mean moves by less than `tolerance` (cosine
+    distance) for `patience` consecutive batches, after at least `min_faces` faces.
+    """
+
+    def __init__(self, model_name="Facenet", detector_backend="opencv", batch_size=4, queue_size=16,
+                 min_sharpness=20.0, sharpness_cap=200.0, tolerance=1e-3, patience=2, min_faces=8):
+        self.model_name = model_name
+        self.detector_backend = detector_backend
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.min_sharpness = min_sharpness
+        self.sharpness_cap = sharpness_cap
+        self.tolerance = tolerance
+        self.patience = patience
+        self.min_faces = min_faces
+        self.reset()
+
+    def reset(self):
+        self.frames_seen = 0
+        self.faces_used = 0
+        self.converged = False
+        self._weighted_sum = None
+        self._total_weight = 0.0
+        self._previous_mean = None
+        self._stable_batches = 0
+        self._pending_faces = []
+        self._pending_weights = []
+
+    def face_weight(self, face_obj):
+        """Weight of one detected face, or None if the frame should be skipped."""
+        confidence = face_obj.get("confidence") or 0
+        if confidence <= 0:
+            return None  # no face found; DeepFace returned the whole frame
+        sharpness = face_sharpness(face_obj["face"])
+        if sharpness < self.min_sharpness:
+            return None
+        return confidence * min(sharpness, self.sharpness_cap) / self.sharpness_cap
+
+    def add_face(self, face, weight):
+        """Queues a face crop; returns True once the embedding has converged."""
+        self._pending_faces.append(face)
+        self._pending_weights.append(weight)
+        if len(self._pending_faces) >= self.batch_size:
+            return self.flush()
+        return False
+
+    def add_frame(self, frame):
+        """Detects the face in a BGR frame and queues it. Returns True once converged."""
+        self.frames_seen += 1
+        try:
+            face_objs = extract_face_crops(frame, detector_backend=self.detector_backend, enforce_detection=False)
+        except Exception:
+            # Continue to next frame on error
+            return False
+        if not face_objs:
+            return False
+        weight = self.face_weight(face_objs[0])
+        if weight is None:
+            return False
+        return self.add_face(face_objs[0]["face"], weight)
+
+    def flush(self):
+        """Embeds the queued faces. Returns True once the running mean has converged."""
+        if not self._pending_faces:
+            return self.converged
+        faces, weights = self._pending_faces, np.asarray(self._pending_weights, dtype=np.float64)
+        self._pending_faces, self._pending_weights = [], []
+        try:
+            embeddings = embed_faces(faces, model_name=self.model_name)
+        except Exception as e:
+            logging.warning(f"Skipping a batch of {len(faces)} faces that failed to embed: {e}")
+            return self.converged
+
+        batch_sum = weights @ embeddings
+        self._weighted_sum = batch_sum if self._weighted_sum is None else self._weighted_sum + batch_sum
+        self._total_weight += float(weights.sum())
+        self.faces_used += len(weights)
+
+        mean = self._weighted_sum / self._weighted_sum_norm()
+        if self._previous_mean is not None and 1.0 - float(mean @ self._previous_mean) < self.tolerance:
+            self._stable_batches += 1
+        else:
+            self._stable_batches = 0
+        self._previous_mean = mean
+        self.converged = self.faces_used >= self.min_faces and self._stable_batches >= self.patience
+        return self.converged
+
+    def result(self):
+        """Weighted mean embedding, or None if no usable face was found."""
+        self.flush()
+        if self._weighted_sum is None or self._total_weight <= 0:
+            return None
+        return self._weighted_sum / self._total_weight
+
+    def embed(self, frames):
+        """
+        Embeds a stream of frames. Decoding runs in a background thread. Raises ValueError if
+        the stream has no frames at all.
+        """
+        self.reset()
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        decoder = threading.Thread(target=_decode, args=(frames, frame_queue, stop), name="video-decode", daemon=True)
+        decoder.start()
+        try:
+            while True:
+                frame = frame_queue.get()
+                if frame is _END:
+                    break
+                if self.add_frame(frame):
+                    logging.debug(f"Video embedding converged after {self.frames_seen} frames.")
+                    break
+        finally:
+            stop.set()
+            # Unblock the decoder if it is waiting on a full queue.
+            while decoder.is_alive():
+                try:
+                    frame_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        if self.frames_seen == 0:
+            raise ValueError("No frames extracted. Check the video file or sample rate.")
+        return self.result()
+
+    def _weighted_sum_norm(self):
+        return max(float(np.linalg.norm(self._weighted_sum)), np.finfo(np.float64).eps)
@@ -0,0 +1,97 @@
+import cv2
+import logging
+
+from deepface_batch import extract_face_crops
+from face_recognition import face_region
+from liveness import LivenessDetector
+from video_embedding import VideoEmbedder
+
+
+def align_tracked_face(frame, rect, detector_backend="opencv"):
+    """
+    Aligns the face in a tracked dlib rectangle the way the reference photo is aligned: DeepFace's
+    detector and eye-based alignment (see face_recognition.align_face), run only on the region
+    around the box. Returns the largest DeepFace face object, or None if nothing is left to search.
+    """
+    region = face_region(frame, (rect.left(), rect.top(), rect.width(), rect.height()))
+    if region.size == 0:
+        return None
+    face_objs = extract_face_crops(region, detector_backend=detector_backend, enforce_detection=False)
+    if not face_objs:
+        return None
+    return max(face_objs, key=lambda face_obj: face_obj["facial_area"]["w"] * face_obj["facial_area"]["h"])
+
+
+def verify_video_stream(video_path, liveness_detector: LivenessDetector, embedder: VideoEmbedder,
+                        sample_rate=1.0, fallback_fps=30.0):
+    """
+    Runs liveness detection and face embedding in one decoding pass over the video.
+
+    Each frame is decoded at most once. Frames analysed for liveness give the face box that the
+    embedder also uses for the frames it samples (one every `sample_rate` seconds), so the whole
+    frame is not searched again: the face is aligned within the region around that box, like the
+    reference photo (see align_tracked_face). Once liveness is settled, the liveness tracker keeps
+    following the face for the embedder. Frames nobody needs are skipped with grab(). The pass stops as soon as the
+    video is judged a spoof, or once liveness is settled (at the latest when the liveness frame
+    budget is used up) and the embedding has converged.
+
+    Returns (is_live, video_embedding or None).
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        embed_interval = max(1, int((fps if fps and fps > 0 else fallback_fps) * sample_rate))
+        liveness_detector.start(total_frames if total_frames > 0 else None)
+        embedder.reset()
+
+        live = None
+        frame_index = 0
+        while True:
+            if live is None and frame_index >= liveness_detector.frame_budget:
+                # Liveness budget used up: settle on the blinks seen so far.
+                live = liveness_detector.decision(frame_index)
+                if live is False:
+                    break
+            needs_liveness = (live is None and frame_index < liveness_detector.frame_budget
+                              and liveness_detector.should_process(frame_index))
+            needs_embedding = frame_index % embed_interval == 0 and not embedder.converged
+            if live is not None and embedder.converged:
+                break
+            if not needs_liveness and not needs_embedding:
+                if not cap.grab():
+                    break
+                frame_index += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if needs_embedding:
+                embedder.frames_seen += 1
+
+            face = None
+            if needs_liveness:
+                face, _ = liveness_detector.observe(frame)
+                live = liveness_detector.decision(frame_index + 1)
+                if live is False:
+                    break
+            elif needs_embedding:
+                face = liveness_detector.tracker.locate(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+            if needs_embedding and face is not None:
+                face_obj = align_tracked_face(frame, face, embedder.detector_backend)
+                if face_obj is not None:
+                    weight = embedder.face_weight(face_obj)
+                    if weight is not None:
+                        embedder.add_face(face_obj["face"], weight)
+            frame_index += 1
+    finally:
+        cap.release()
+
+    if live is None:
+        live = liveness_detector.blink_counter.blinks >= liveness_detector.min_blinks
+    if not live:
+        return False, None
+    logging.debug(f"Single-pass verification read {frame_index} frames.")
+    return True, embedder.result()